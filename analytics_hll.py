@@ -0,0 +1,62 @@
+"""
+HyperLogLog sketches for approximate distinct-session counts.
+
+A sketch is 2**PRECISION one-byte registers stored as a BLOB. Sketches of
+the same precision merge with an element-wise max, so per-day sketches can
+be combined into any date range without touching the raw rows.
+
+With PRECISION=12 a sketch is 4 KB and the standard error is
+1.04 / sqrt(4096) ≈ 1.6%.
+"""
+
+import hashlib
+import math
+from typing import Iterable, Optional
+
+import numpy as np
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+_REST_BITS = 64 - PRECISION
+_REST_MASK = (1 << _REST_BITS) - 1
+
+# Relative standard error of an estimate
+STANDARD_ERROR = 1.04 / math.sqrt(REGISTERS)
+
+
+def new_sketch() -> bytearray:
+    return bytearray(REGISTERS)
+
+
+def add(sketch: bytearray, value: str) -> None:
+    h = int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+    index = h >> _REST_BITS
+    rank = _REST_BITS - (h & _REST_MASK).bit_length() + 1
+    if rank > sketch[index]:
+        sketch[index] = rank
+
+
+def merge(sketches: Iterable[Optional[bytes]]) -> np.ndarray:
+    """Element-wise max of any number of sketches (None/empty ones are skipped)."""
+    out = np.zeros(REGISTERS, dtype=np.uint8)
+    for s in sketches:
+        if s:
+            np.maximum(out, np.frombuffer(s, dtype=np.uint8), out=out)
+    return out
+
+
+def estimate(registers) -> float:
+    """Cardinality estimate with the usual small-range (linear counting) correction."""
+    if isinstance(registers, np.ndarray):
+        regs = registers
+    else:
+        regs = np.frombuffer(bytes(registers), dtype=np.uint8)
+    m = float(REGISTERS)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.ldexp(1.0, -regs.astype(np.int64)))
+    zeros = int(np.count_nonzero(regs == 0))
+    if raw <= 2.5 * m and zeros:
+        return m * math.log(m / zeros)
+    return float(raw)
@@ -0,0 +1,488 @@
+"""
+Read-only analytics queries shared by `analytics_cli.py` and the
+`/api/analytics` router (app/routes/analytics.py).
+
+Functions here return plain dicts; printing stays in the CLI and JSON
+encoding in the router. Every query can read the raw tables or the rollup
+tables built by `analytics_cli.py rollup`, be restricted to a [since, until)
+window and be broken down per hour/day/week bucket.
+
+`connect()` takes a SQLite path or the app's DB_URL, so the same queries
+run on SQLite and PostgreSQL (the few dialect-specific bits go through
+`dialect(conn)`).
+"""
+
+import itertools
+import os
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from urllib.request import pathname2url
+
+
+# --------- DB connection --------- #
+
+# Rows fetched per round trip by `stream()` on PostgreSQL
+STREAM_ITERSIZE = 5000
+
+def sqlite_read_pragmas() -> list:
+    """Read-side part of the app's SQLite profile (see app/db.py).
+
+    Uses the same environment variables as the app's Settings. The journal
+    mode is not set here: WAL is persistent once the app has enabled it.
+    """
+    if os.getenv("SQLITE_TUNING", "true").lower() in ("0", "false", "no", "off"):
+        return []
+    return [
+        f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+        f"PRAGMA cache_size={int(os.getenv('SQLITE_CACHE_SIZE', -64000))}",
+        f"PRAGMA temp_store={os.getenv('SQLITE_TEMP_STORE', 'MEMORY')}",
+    ]
+
+
+class PgConnection:
+    """The slice of sqlite3.Connection these queries use, over psycopg2.
+
+    `?` placeholders become `%s`, rows are addressable by name and position
+    like sqlite3.Row, and `with conn:` commits or rolls back. Sessions run in
+    UTC so hour/day buckets match the SQLite ones.
+    """
+
+    dialect = "postgresql"
+
+    def __init__(self, url: str, readonly: bool = True):
+        import psycopg2
+
+        self._raw = psycopg2.connect(url)
+        self._raw.set_session(readonly=readonly, autocommit=readonly)
+        with self._raw.cursor() as cur:
+            cur.execute("SET TIME ZONE 'UTC'")
+
+    def cursor(self):
+        return _PgCursor(self._raw)
+
+    def execute(self, sql: str, params=()):
+        cur = self.cursor()
+        cur.execute(sql, params)
+        return cur
+
+    def stream(self, sql: str, params=()):
+        """Like `execute`, through a server-side cursor: rows arrive
+        STREAM_ITERSIZE at a time instead of the whole result at once.
+        The cursor is closed once the rows have been iterated."""
+        cur = _PgCursor(self._raw, name=f"rf_stream_{next(_stream_ids)}")
+        cur.execute(sql, params)
+        return _iterate_and_close(cur)
+
+    def executescript(self, sql: str) -> None:
+        with self._raw.cursor() as cur:
+            cur.execute(sql)
+        self._raw.commit()
+
+    def commit(self) -> None:
+        self._raw.commit()
+
+    def rollback(self) -> None:
+        self._raw.rollback()
+
+    def close(self) -> None:
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._raw.commit()
+        else:
+            self._raw.rollback()
+
+
+_stream_ids = itertools.count(1)
+
+
+def _iterate_and_close(cur):
+    try:
+        yield from cur
+    finally:
+        cur.close()
+
+
+class _PgCursor:
+    def __init__(self, raw, name: Optional[str] = None):
+        from psycopg2.extras import DictCursor
+
+        if name is None:
+            self._cur = raw.cursor(cursor_factory=DictCursor)
+        else:
+            # WITH HOLD: read-only connections are in autocommit mode,
+            # where a plain named cursor would not outlive its DECLARE
+            self._cur = raw.cursor(name=name, cursor_factory=DictCursor, withhold=True)
+            self._cur.itersize = STREAM_ITERSIZE
+
+    def execute(self, sql: str, params=()):
+        self._cur.execute(sql.replace("%", "%%").replace("?", "%s"), tuple(params))
+        return self
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def fetchmany(self, size: int):
+        return self._cur.fetchmany(size)
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self) -> None:
+        self._cur.close()
+
+
+Connection = Union[sqlite3.Connection, PgConnection]
+
+
+def connect(target: str, readonly: bool = True) -> Connection:
+    """Opens a SQLite file path or a DB_URL (sqlite:///... or postgresql://...).
+
+    Read-only by default so reports never take write locks. Raises
+    FileNotFoundError instead of letting SQLite create an empty file.
+    """
+    if "://" in target:
+        scheme, _, rest = target.partition("://")
+        backend = scheme.split("+")[0]
+        if backend == "postgresql":
+            return PgConnection(f"postgresql://{rest}", readonly=readonly)
+        if backend != "sqlite":
+            raise ValueError(f"unsupported database URL: {scheme}://")
+        target = rest[1:]  # sqlite:///relative.db, sqlite:////abs/path.db
+
+    if not os.path.exists(target):
+        raise FileNotFoundError(target)
+    if readonly:
+        uri = f"file:{pathname2url(os.path.abspath(target))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)
+    else:
+        conn = sqlite3.connect(target)
+    conn.row_factory = sqlite3.Row
+    for pragma in sqlite_read_pragmas():
+        conn.execute(pragma)
+    return conn
+
+
+def dialect(conn: Connection) -> str:
+    """'sqlite' or 'postgresql'."""
+    return getattr(conn, "dialect", "sqlite")
+
+
+def stream(conn: Connection, sql: str, params=()):
+    """Rows of a large SELECT, to iterate once without holding them all.
+
+    sqlite3 cursors already step through results; psycopg2 ones would
+    buffer everything, so PostgreSQL goes through `PgConnection.stream`.
+    """
+    if dialect(conn) == "postgresql":
+        return conn.stream(sql, params)
+    return conn.execute(sql, params)
+
+
+def table_exists(conn: Connection, name: str) -> bool:
+    if dialect(conn) == "postgresql":
+        sql = """
+            SELECT 1 FROM information_schema.tables
+            WHERE table_schema = current_schema() AND table_name = ?
+        """
+    else:
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    return conn.execute(sql, (name,)).fetchone() is not None
+
+
+def table_names(conn: Connection) -> List[str]:
+    if dialect(conn) == "postgresql":
+        sql = "SELECT table_name FROM information_schema.tables WHERE table_schema = current_schema()"
+    else:
+        sql = "SELECT name FROM sqlite_master WHERE type = 'table'"
+    return [r[0] for r in conn.execute(sql)]
+
+
+# --------- time windows --------- #
+#
+# A window restricts the raw `timestamp` column to [since, until), which the
+# timestamp indexes serve as range scans; rollup tables are filtered on their
+# `hour` column instead. A bucket adds a `bucket` column (the bucket start)
+# to every row.
+
+# SQL for the start of the bucket containing `column`, per dialect
+BUCKETS = {
+    "sqlite": {
+        "hour": "strftime('%Y-%m-%d %H:00', {column})",
+        "day": "date({column})",
+        "week": "date({column}, 'weekday 0', '-6 days')",  # Monday
+    },
+    "postgresql": {
+        "hour": "to_char(date_trunc('hour', ({column})::timestamp), 'YYYY-MM-DD HH24:00')",
+        "day": "to_char(({column})::timestamp, 'YYYY-MM-DD')",
+        "week": "to_char(date_trunc('week', ({column})::timestamp), 'YYYY-MM-DD')",  # Monday
+    },
+}
+BUCKET_NAMES = list(BUCKETS["sqlite"])
+
+
+def parse_time(value: str, end: bool = False) -> str:
+    """Normalize a date/time to the stored 'YYYY-MM-DD HH:MM:SS' form.
+
+    A bare date given as the end of a window covers that whole day.
+    """
+    try:
+        ts = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(
+            f"invalid date/time '{value}' (use YYYY-MM-DD or 'YYYY-MM-DD HH:MM')"
+        ) from None
+    if end and len(value) == 10:
+        ts += timedelta(days=1)
+    return ts.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def time_filter(column: str, since: Optional[str], until: Optional[str]) -> Tuple[str, list]:
+    """`AND ...` clause and params restricting `column` to [since, until)."""
+    sql, params = "", []
+    if since:
+        sql += f" AND {column} >= ?"
+        params.append(since)
+    if until:
+        sql += f" AND {column} < ?"
+        params.append(until)
+    return sql, params
+
+
+def bucket_select(conn: Connection, bucket: Optional[str], column: str) -> str:
+    """`<bucket start> AS bucket, ` for the SELECT list, or '' without a bucket."""
+    if not bucket:
+        return ""
+    return f"{BUCKETS[dialect(conn)][bucket].format(column=column)} AS bucket, "
+
+
+# --------- monthly partitions --------- #
+#
+# The app writes events and page_views into one table per month
+# (events_2025_03, ...; see app/partitions.py) next to the base tables,
+# which keep the rows written before partitioning. Raw queries read
+# `FROM {source(conn, table, since, until)}`: the base table plus only the
+# partitions overlapping the window, as one UNION ALL subquery. Plain
+# counts use count_query(), which adds up per-partition counts instead.
+
+PARTITION_RE = re.compile(r"^(events|page_views)_(\d{4})_(\d{2})$")
+
+# Columns shared by a base table and its partitions, in table order
+TABLE_COLUMNS = {
+    "events": [
+        "id", "timestamp", "session_id", "variant_name", "event_name",
+        "page_url", "metadata", "referrer", "user_agent",
+    ],
+    "page_views": ["id", "timestamp", "session_id", "variant_name", "page"],
+}
+
+
+def partitions(conn: Connection, table: str) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """(name, start, end) of `table` and its monthly partitions, oldest month
+    first; the base table comes first and has no bounds."""
+    found = [(table, None, None)]
+    for name in sorted(table_names(conn)):
+        m = PARTITION_RE.match(name)
+        if m and m.group(1) == table:
+            year, month = int(m.group(2)), int(m.group(3))
+            start = datetime(year, month, 1)
+            end = datetime(year + month // 12, month % 12 + 1, 1)
+            found.append((name, str(start), str(end)))
+    return found
+
+
+def overlapping(conn: Connection, table: str, since: Optional[str] = None, until: Optional[str] = None) -> List[str]:
+    """`table` and those of its partitions that overlap [since, until)."""
+    return [
+        name for name, start, end in partitions(conn, table)
+        if start is None or ((until is None or start < until) and (since is None or end > since))
+    ]
+
+
+def source(conn: Connection, table: str, since: Optional[str] = None, until: Optional[str] = None) -> str:
+    """FROM-clause item reading `table` and its partitions overlapping [since, until)."""
+    names = overlapping(conn, table, since, until)
+    if len(names) == 1:
+        return table
+    columns = ", ".join(TABLE_COLUMNS[table])
+    union = " UNION ALL ".join(f"SELECT {columns} FROM {name}" for name in names)
+    return f"({union}) AS {table}"
+
+
+def count_query(
+    conn: Connection,
+    table: str,
+    keys: str,
+    where: str,
+    params: Sequence,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    bucket: Optional[str] = None,
+    value: str = "count",
+) -> Tuple[str, list]:
+    """(sql, params) counting the rows of `table` matching `where`, per
+    `bucket` and `keys`, over the partitions overlapping [since, until).
+
+    Each partition is counted on its own (through its indexes) and the
+    counts are added up: grouping the UNION ALL of every row instead is
+    several times slower over a few months.
+    """
+    series = bucket_select(conn, bucket, "timestamp")
+    group = f"{'bucket, ' if bucket else ''}{keys}"
+    counts = [
+        f"SELECT {series}{keys}, COUNT(*) AS {value} FROM {name} WHERE {where} GROUP BY {group}"
+        for name in overlapping(conn, table, since, until)
+    ]
+    if len(counts) == 1:
+        return f"{counts[0]} ORDER BY {group}", list(params)
+    return (
+        f"SELECT {group}, CAST(SUM({value}) AS BIGINT) AS {value}"
+        f" FROM ({' UNION ALL '.join(counts)}) AS counts"
+        f" GROUP BY {group} ORDER BY {group}",
+        list(params) * len(counts),
+    )
+
+
+# --------- queries --------- #
+
+def summary_rows(
+    conn: Connection,
+    use_rollups: bool = False,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    bucket: Optional[str] = None,
+) -> Tuple[List[Dict], List[Dict]]:
+    """(events by variant and name, page views by variant and page)."""
+    ts = "hour" if use_rollups else "timestamp"
+    window, params = time_filter(ts, since, until)
+    series = bucket_select(conn, bucket, ts)
+    by = "bucket, " if bucket else ""
+
+    if use_rollups:
+        events_query = f"""
+            SELECT {series}NULLIF(variant_name, '') AS variant_name, event_name, SUM(count) AS count
+            FROM rollup_events
+            WHERE 1 = 1{window}
+            GROUP BY {by}variant_name, event_name
+            ORDER BY {by}variant_name, event_name
+        """, params
+        page_views_query = f"""
+            SELECT {series}NULLIF(variant_name, '') AS variant_name, page, SUM(count) AS count
+            FROM rollup_page_views
+            WHERE 1 = 1{window}
+            GROUP BY {by}variant_name, page
+            ORDER BY {by}variant_name, page
+        """, params
+    else:
+        events_query = count_query(
+            conn, "events", "variant_name, event_name", f"1 = 1{window}", params, since, until, bucket
+        )
+        page_views_query = count_query(
+            conn, "page_views", "variant_name, page", f"1 = 1{window}", params, since, until, bucket
+        )
+    events = [dict(r) for r in conn.execute(*events_query)]
+    page_views = [dict(r) for r in conn.execute(*page_views_query)]
+    return events, page_views
+
+
+def events_like_rows(
+    conn: Connection,
+    pattern: str,
+    use_rollups: bool = False,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    bucket: Optional[str] = None,
+) -> List[Dict]:
+    """Event counts by variant and name for names matching a SQL LIKE pattern."""
+    ts = "hour" if use_rollups else "timestamp"
+    window, params = time_filter(ts, since, until)
+    series = bucket_select(conn, bucket, ts)
+    by = "bucket, " if bucket else ""
+    if use_rollups:
+        query = f"""
+            SELECT {series}NULLIF(variant_name, '') AS variant_name, event_name, SUM(count) AS count
+            FROM rollup_events
+            WHERE event_name LIKE ?{window}
+            GROUP BY {by}variant_name, event_name
+            ORDER BY {by}variant_name, event_name
+        """, (pattern, *params)
+    else:
+        query = count_query(
+            conn, "events", "variant_name, event_name", f"event_name LIKE ?{window}",
+            (pattern, *params), since, until, bucket,
+        )
+    return [dict(r) for r in conn.execute(*query)]
+
+
+def conversion_rows(
+    conn: Connection,
+    event_name: str,
+    page: str,
+    use_rollups: bool = False,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    bucket: Optional[str] = None,
+) -> List[Dict]:
+    """Page views of `page`, events fired on it and their ratio, by variant."""
+    ts = "hour" if use_rollups else "timestamp"
+    window, params = time_filter(ts, since, until)
+    series = bucket_select(conn, bucket, ts)
+    by = "bucket, " if bucket else ""
+
+    # Pageviews per variant
+    if use_rollups:
+        pv_query = f"""
+            SELECT {series}NULLIF(variant_name, '') AS variant_name, SUM(count) AS pageviews
+            FROM rollup_page_views
+            WHERE page = ?{window}
+            GROUP BY {by}variant_name
+        """, (page, *params)
+    else:
+        pv_query = count_query(
+            conn, "page_views", "variant_name", f"page = ?{window}", (page, *params),
+            since, until, bucket, value="pageviews",
+        )
+
+    # Events per variant
+    if use_rollups:
+        ev_query = f"""
+            SELECT {series}NULLIF(variant_name, '') AS variant_name, SUM(count) AS events
+            FROM rollup_events
+            WHERE event_name = ?
+              AND page_url = ?{window}
+            GROUP BY {by}variant_name
+        """, (event_name, page, *params)
+    else:
+        ev_query = count_query(
+            conn, "events", "variant_name", f"event_name = ? AND page_url = ?{window}",
+            (event_name, page, *params), since, until, bucket, value="events",
+        )
+
+    def keyed(rows, value):
+        # (bucket, variant) -> value; bucket is None without a bucket
+        return {(r["bucket"] if bucket else None, r["variant_name"]): r[value] for r in rows}
+
+    pv = keyed(conn.execute(*pv_query), "pageviews")
+    ev = keyed(conn.execute(*ev_query), "events")
+
+    rows = []
+    for b, v in sorted(set(pv) | set(ev), key=lambda k: (k[0] or "", k[1] is None, k[1] or "")):
+        pageviews, events = pv.get((b, v), 0), ev.get((b, v), 0)
+        row = {"variant_name": v, "pageviews": pageviews, "events": events,
+               "conversion": events / pageviews if pageviews else 0.0}
+        rows.append({"bucket": b, **row} if bucket else row)
+    return rows
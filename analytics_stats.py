@@ -0,0 +1,218 @@
+"""
+Significance tests for A/B conversion data, used by `analytics_cli.py significance`.
+
+Every function works on aggregates, not raw rows:
+
+    successes[e, v]  sessions of variant v that converted on event e
+    trials[e, v]     sessions of variant v that were exposed
+
+Both are 2-D arrays (events x variants), so hundreds of event names are
+compared in one vectorized pass. `control` is the column index of the
+control variant.
+"""
+
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+
+# --------- distributions --------- #
+
+def _erfc(x: np.ndarray) -> np.ndarray:
+    """Complementary error function, fractional error < 1.2e-7 (Numerical Recipes erfcc)."""
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = -z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (
+        0.09678418 + t * (-0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (
+            1.48851587 + t * (-0.82215223 + t * 0.17087277))))))))
+    ans = t * np.exp(poly)
+    return np.where(x >= 0, ans, 2.0 - ans)
+
+
+def norm_sf(x: np.ndarray) -> np.ndarray:
+    """P(Z > x) for a standard normal."""
+    return 0.5 * _erfc(np.asarray(x, dtype=float) / math.sqrt(2.0))
+
+
+def _gammaincc(a: float, x: float) -> float:
+    """Regularized upper incomplete gamma Q(a, x) (series / continued fraction)."""
+    if x <= 0:
+        return 1.0
+    log_prefix = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1:
+        term = total = 1.0 / a
+        ap = a
+        for _ in range(500):
+            ap += 1
+            term *= x / ap
+            total += term
+            if abs(term) < abs(total) * 1e-12:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    # Lentz's continued fraction
+    b = x + 1 - a
+    c = 1 / 1e-300
+    d = 1 / b
+    h = d
+    for i in range(1, 500):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = 1e-300 if abs(d) < 1e-300 else d
+        c = b + an / c
+        c = 1e-300 if abs(c) < 1e-300 else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-12:
+            break
+    return math.exp(log_prefix) * h
+
+
+_chi2_sf = np.vectorize(lambda x, dof: _gammaincc(dof / 2.0, x / 2.0), otypes=[float])
+
+
+# --------- tests --------- #
+
+def conversion_rates(successes, trials) -> np.ndarray:
+    s, n = np.asarray(successes, float), np.asarray(trials, float)
+    return np.divide(s, n, out=np.zeros_like(s), where=n > 0)
+
+
+def wilson_interval(successes, trials, alpha: float = 0.05):
+    """Wilson score interval for each conversion rate."""
+    s, n = np.asarray(successes, float), np.asarray(trials, float)
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    p = conversion_rates(s, n)
+    safe_n = np.where(n > 0, n, 1)
+    denom = 1 + z * z / safe_n
+    center = (p + z * z / (2 * safe_n)) / denom
+    half = z * np.sqrt(p * (1 - p) / safe_n + z * z / (4 * safe_n * safe_n)) / denom
+    lo = np.where(n > 0, center - half, 0.0)
+    hi = np.where(n > 0, center + half, 1.0)
+    return np.clip(lo, 0, 1), np.clip(hi, 0, 1)
+
+
+def two_proportion_ztest(successes, trials, control: int = 0):
+    """Pooled two-proportion z-test of every variant against the control.
+
+    Returns (z, two-sided p). The control column gets z=0, p=1.
+    """
+    s, n = np.asarray(successes, float), np.asarray(trials, float)
+    s0, n0 = s[:, [control]], n[:, [control]]
+    pooled = conversion_rates(s + s0, n + n0)
+    se = np.sqrt(pooled * (1 - pooled) * (
+        np.divide(1, n, out=np.zeros_like(n), where=n > 0)
+        + np.divide(1, n0, out=np.zeros_like(n0), where=n0 > 0)
+    ))
+    diff = conversion_rates(s, n) - conversion_rates(s0, n0)
+    z = np.divide(diff, se, out=np.zeros_like(diff), where=se > 0)
+    p = np.minimum(1.0, 2 * norm_sf(np.abs(z)))
+    z[:, control] = 0.0
+    p[:, control] = 1.0
+    return z, p
+
+
+def chi_square_test(successes, trials):
+    """Chi-square test of homogeneity across all variants (one per event).
+
+    Returns (chi2, dof, p). Variants with no trials are ignored.
+    """
+    s, n = np.asarray(successes, float), np.asarray(trials, float)
+    observed = np.stack([s, n - s], axis=-1)  # events x variants x {yes, no}
+    row_tot = observed.sum(axis=-1, keepdims=True)
+    col_tot = observed.sum(axis=1, keepdims=True)
+    grand = row_tot.sum(axis=1, keepdims=True)
+    expected = np.divide(row_tot * col_tot, grand, out=np.zeros_like(observed), where=grand > 0)
+    cells = np.divide((observed - expected) ** 2, expected,
+                      out=np.zeros_like(observed), where=expected > 0)
+    chi2 = cells.sum(axis=(1, 2))
+    variants_used = (n > 0).sum(axis=1)
+    outcomes_used = (col_tot[:, 0, :] > 0).sum(axis=1)
+    dof = np.maximum((variants_used - 1) * (outcomes_used - 1), 0)
+    p = np.where(dof > 0, np.minimum(1.0, _chi2_sf(chi2, np.maximum(dof, 1))), 1.0)
+    return chi2, dof, p
+
+
+def prob_beat_control(successes, trials, control: int = 0, draws: int = 20_000, seed: int = 0):
+    """Bayesian P(rate_v > rate_control) with independent Beta(1, 1) priors.
+
+    Monte Carlo over Beta posteriors, processed in blocks of events so
+    memory stays bounded however many events are compared.
+    """
+    s, n = np.asarray(successes, float), np.asarray(trials, float)
+    rng = np.random.default_rng(seed)
+    events, variants = s.shape
+    out = np.empty((events, variants))
+    block = max(1, 2_000_000 // max(1, variants * draws))
+    for start in range(0, events, block):
+        a = 1 + s[start:start + block]
+        b = 1 + (n - s)[start:start + block]
+        samples = rng.beta(a[..., None], b[..., None], size=a.shape + (draws,))
+        out[start:start + block] = (samples > samples[:, [control]]).mean(axis=-1)
+    out[:, control] = np.nan
+    return out
+
+
+def always_valid_interval(
+    successes, trials, control: int = 0, alpha: float = 0.05, mixture_sd: float = 0.05
+):
+    """Sequential-testing-safe bounds for (rate_v - rate_control).
+
+    Normal-mixture SPRT (mSPRT): the interval and p-value stay valid no
+    matter how often the results are looked at while data keeps coming in.
+    `mixture_sd` is the prior scale of plausible lifts (absolute rate).
+
+    Returns (lo, hi, always-valid p).
+    """
+    s, n = np.asarray(successes, float), np.asarray(trials, float)
+    p = conversion_rates(s, n)
+    p0, n0 = p[:, [control]], n[:, [control]]
+    var = (
+        np.divide(p * (1 - p), n, out=np.zeros_like(p), where=n > 0)
+        + np.divide(p0 * (1 - p0), n0, out=np.zeros_like(p0), where=n0 > 0)
+    )
+    var = np.maximum(var, 1e-12)
+    tau2 = mixture_sd ** 2
+    diff = p - p0
+
+    radius = np.sqrt(var * (var + tau2) / tau2 * (2 * math.log(1 / alpha) + np.log((var + tau2) / var)))
+    log_lr = 0.5 * np.log(var / (var + tau2)) + tau2 * diff ** 2 / (2 * var * (var + tau2))
+    p_value = np.minimum(1.0, np.exp(-log_lr))
+
+    empty = (n == 0) | (n0 == 0)
+    lo = np.where(empty, -1.0, np.maximum(diff - radius, -1.0))
+    hi = np.where(empty, 1.0, np.minimum(diff + radius, 1.0))
+    p_value = np.where(empty, 1.0, p_value)
+    lo[:, control] = hi[:, control] = 0.0
+    p_value[:, control] = 1.0
+    return lo, hi, p_value
+
+
+def compare_variants(successes, trials, control: int = 0, alpha: float = 0.05) -> dict:
+    """Runs every test above and returns the results keyed by name."""
+    s = np.minimum(np.asarray(successes, float), np.asarray(trials, float))
+    n = np.asarray(trials, float)
+    rate = conversion_rates(s, n)
+    ci_lo, ci_hi = wilson_interval(s, n, alpha)
+    z, z_p = two_proportion_ztest(s, n, control)
+    chi2, dof, chi2_p = chi_square_test(s, n)
+    seq_lo, seq_hi, seq_p = always_valid_interval(s, n, control, alpha)
+    rate0 = rate[:, [control]]
+    lift = np.divide(rate - rate0, rate0, out=np.full_like(rate, np.nan), where=rate0 > 0)
+    return {
+        "rate": rate,
+        "ci_lo": ci_lo,
+        "ci_hi": ci_hi,
+        "lift": lift,
+        "z": z,
+        "z_p": z_p,
+        "chi2": chi2,
+        "chi2_dof": dof,
+        "chi2_p": chi2_p,
+        "p_beat_control": prob_beat_control(s, n, control),
+        "seq_lo": seq_lo,
+        "seq_hi": seq_hi,
+        "seq_p": seq_p,
+    }
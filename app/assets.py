@@ -0,0 +1,166 @@
+# app/assets.py
+"""Fingerprinted, precompressed static assets.
+
+`python -m app.assets` (run by the Dockerfile once Tailwind has built
+main.css) copies every file under app/static into app/static/dist/ with a
+hash of its content in the name (css/main.css -> dist/css/main.3f2a1b9c0d.css),
+writes .br and .gz siblings of the text ones, and records it all in
+dist/manifest.json. Re-run it whenever an asset changes.
+
+At runtime:
+- `url_for('static', path=...)` in templates returns the hashed URL of
+  assets in the manifest, and the plain one otherwise (see deps.py);
+- `PrecompressedStaticFiles` serves the .br/.gz sibling the client
+  accepts, and lets browsers cache hashed files forever.
+
+Without a build (local development) assets are served as before.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import shutil
+from pathlib import Path
+
+import anyio
+from jinja2 import pass_context
+from starlette.datastructures import URL, Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+STATIC_DIR = Path("app/static")
+DIST = "dist"
+MANIFEST_FILE = STATIC_DIR / DIST / "manifest.json"
+
+# Worth compressing; images and fonts already are
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+# Sibling suffix per Content-Encoding, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+# A hashed URL never changes content, so it never needs revalidating
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _compressors() -> dict:
+    compressors = {"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        return compressors  # gzip only
+    return {"br": lambda data: brotli.compress(data, quality=11), **compressors}
+
+
+def build(static_dir: Path = STATIC_DIR) -> dict:
+    """Writes dist/ and its manifest; returns the manifest."""
+    out = static_dir / DIST
+    shutil.rmtree(out, ignore_errors=True)
+    compressors = _compressors()
+    assets, encodings = {}, {}
+
+    for src in sorted(static_dir.rglob("*")):
+        if not src.is_file() or out in src.parents:
+            continue
+        data = src.read_bytes()
+        digest = hashlib.blake2b(data, digest_size=5).hexdigest()
+        rel = src.relative_to(static_dir)
+        hashed = f"{DIST}/{rel.with_name(f'{src.stem}.{digest}{src.suffix}').as_posix()}"
+        dest = static_dir / hashed
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(data)
+        assets[rel.as_posix()] = hashed
+
+        if src.suffix not in COMPRESSIBLE:
+            continue
+        for encoding, compress in compressors.items():
+            packed = compress(data)
+            if len(packed) < len(data) * 0.95:  # tiny files barely shrink
+                dest.with_name(dest.name + ENCODINGS[encoding]).write_bytes(packed)
+                encodings.setdefault(hashed, []).append(encoding)
+
+    manifest = {"assets": assets, "encodings": encodings}
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+def load_manifest(path: Path = MANIFEST_FILE) -> dict:
+    if not path.exists():
+        return {"assets": {}, "encodings": {}}
+    return json.loads(path.read_text())
+
+
+manifest = load_manifest()
+_hashed = set(manifest["assets"].values())
+
+
+def asset_path(path: str) -> str:
+    """`path` under app/static -> the path to link to (hashed once built)."""
+    return manifest["assets"].get(path, path)
+
+
+@pass_context
+def url_for(context: dict, name: str, /, **path_params) -> URL:
+    """Starlette's template `url_for`, with hashed paths for static assets."""
+    if name == "static" and "path" in path_params:
+        path_params["path"] = asset_path(path_params["path"])
+    return context["request"].url_for(name, **path_params)
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Content codings allowed by an Accept-Encoding header (q=0 excluded)."""
+    accepted = set()
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves the .br/.gz siblings written by `build()` and
+    sends hashed files with an immutable Cache-Control."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        encodings = manifest["encodings"].get(path)
+        if encodings:
+            accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+            for encoding in encodings:
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(
+                    self.lookup_path, path + ENCODINGS[encoding]
+                )
+                if stat_result is None:
+                    break  # dist/ changed under us: serve the plain file
+                return FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=mimetypes.guess_type(path)[0] or "text/plain",
+                    headers={
+                        "Content-Encoding": encoding,
+                        "Vary": "Accept-Encoding",
+                        "Cache-Control": IMMUTABLE,
+                    },
+                )
+
+        response = await super().get_response(path, scope)
+        if path in _hashed and response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE
+            if encodings:
+                response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+if __name__ == "__main__":
+    built = build()
+    print(
+        f"{len(built['assets'])} assets fingerprinted into {STATIC_DIR / DIST}, "
+        f"{len(built['encodings'])} with precompressed siblings"
+    )
@@ -1,4 +1,8 @@
-from sqlalchemy import create_engine
+from collections.abc import AsyncIterator
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from .config import settings
 
@@ -6,7 +10,81 @@ connect_args = {}
 if settings.DB_URL.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
 
-engine = create_engine(settings.DB_URL, connect_args=connect_args)
+
+def pool_options(url: str) -> dict:
+    """Pool settings for create_engine / create_async_engine.
+
+    SQLite keeps SQLAlchemy's defaults: a file needs no pooled sockets.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+# Sync engine: create_all, migrations and scripts
+engine = create_engine(settings.DB_URL, connect_args=connect_args, **pool_options(settings.DB_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for the sync URLs used everywhere else
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_db_url(url: str) -> str:
+    """DB_URL with its async driver, e.g. sqlite:///x.db -> sqlite+aiosqlite:///x.db."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()!r}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+# Async engine: every write made while serving a request
+async_engine = create_async_engine(async_db_url(settings.DB_URL), **pool_options(settings.DB_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency: one AsyncSession per request."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 Base = declarative_base()
+
+
+def sqlite_pragmas() -> list[str]:
+    """PRAGMAs run on every new SQLite connection (empty when tuning is off).
+
+    WAL lets readers (other workers, analytics_cli.py) run while a worker
+    commits, and busy_timeout makes writers wait for the lock instead of
+    failing with `database is locked`.
+    """
+    if not settings.SQLITE_TUNING:
+        return []
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}",
+        f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}",
+        f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}",
+    ]
+
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+        cursor.close()
@@ -1,8 +1,19 @@
 # app/deps.py
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
 from fastapi.templating import Jinja2Templates
-from fastapi import Request, HTTPException
+from fastapi import Header, Request, HTTPException
+from fastapi.responses import HTMLResponse, Response
 from jinja2 import TemplateNotFound
 
+from . import assets, metrics
+from .config import settings
+from .variants import template_resolver
+
 templates = Jinja2Templates(directory="app/templates")
 
 
@@ -14,10 +25,146 @@ def common_context(request: Request, title: str | None = None):
     }
 
 
+def require_bearer_token(setting: str):
+    """Dependency checking `Authorization: Bearer <token>` against
+    `settings.<setting>` (e.g. "METRICS_TOKEN"); 401 otherwise.
+
+    The setting is read on every request. While it is empty nobody gets in.
+    """
+
+    def check(authorization: str | None = Header(default=None)) -> None:
+        token = getattr(settings, setting)
+        scheme, _, value = (authorization or "").partition(" ")
+        if not token or scheme.lower() != "bearer" or not secrets.compare_digest(value, token):
+            raise HTTPException(status_code=401, detail="Invalid token")
+
+    return check
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered pages: key -> (html bytes, etag).
+
+    Page handlers are sync and run in the threadpool, hence the lock.
+    A `maxsize` of 0 disables caching.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def put(self, key, entry) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+render_cache = RenderCache(settings.RENDER_CACHE_SIZE)
+# Search results come and go with every keystroke: they get their own LRU
+# so they can never evict the pages
+fragment_cache = RenderCache(settings.RENDER_FRAGMENT_CACHE_SIZE)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison, as required for If-None-Match (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def _render(template_name: str, variant: str | None, ctx: dict) -> str:
+    # variants/<variant>/<template_name> if it exists, else template_name
+    resolved = template_resolver.resolve(template_name, variant)
+    try:
+        template = templates.get_template(resolved)
+    except TemplateNotFound:
+        raise HTTPException(status_code=500, detail=f"Template not found: {template_name}")
+    if not metrics.ENABLED:
+        return template.render(ctx)
+    start = time.perf_counter()
+    html = template.render(ctx)
+    metrics.TEMPLATE_RENDER_LATENCY.labels(resolved).observe(time.perf_counter() - start)
+    return html
+
+
+def _cached_render(
+    request: Request,
+    template_name: str,
+    context: dict,
+    cache_version,
+    cache_params: tuple,
+    cache: RenderCache = render_cache,
+):
+    """(html bytes, etag) of a variant template, through `cache`."""
+    variant = getattr(request.state, "variant", None)
+
+    # Templates only see the URL through url_for (absolute, hence base_url)
+    # and what the handler read from the query string (cache_params): junk
+    # params like ?x=1, ?x=2 must not each get an entry and evict real pages.
+    # generation: a new override (of the page or of any partial it
+    # includes) must not be hidden behind HTML rendered before it existed
+    key = (
+        template_name, variant, str(request.base_url), request.url.path, cache_params,
+        cache_version, template_resolver.generation,
+    )
+    entry = cache.get(key)
+    if metrics.ENABLED:
+        metrics.RENDER_CACHE.labels("miss" if entry is None else "hit").inc()
+    if entry is None:
+        ctx = dict(context)  # copy to avoid surprises
+        ctx.setdefault("current_variant", variant)
+        body = _render(template_name, variant, ctx).encode("utf-8")
+        entry = (body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+        cache.put(key, entry)
+    return entry
+
+
+def render_variant_fragment(
+    request: Request,
+    template_name: str,
+    context: dict,
+    cache_version=None,
+    cache_params: tuple | None = (),
+) -> str:
+    """Like `render_variant_template`, but returns the HTML itself, for
+    partials embedded in API responses (e.g. cards in /api/initiatives).
+
+    Fragments are cached in `fragment_cache`, not with the pages. Pass
+    `cache_params=None` for results not worth keeping (e.g. empty ones).
+    """
+    if cache_params is None:
+        variant = getattr(request.state, "variant", None)
+        return _render(template_name, variant, {"current_variant": variant, **context})
+    body, _ = _cached_render(
+        request, template_name, context, cache_version, cache_params, cache=fragment_cache
+    )
+    return body.decode("utf-8")
+
+
 def render_variant_template(
     request: Request,
     template_name: str,
     context: dict,
+    cache_version=None,
+    cache_params: tuple = (),
 ):
     """
     Renders a template with optional variant-specific override.
@@ -27,27 +174,25 @@ def render_variant_template(
 
     That lets you create full-page variant templates simply by
     placing them in app/templates/variants/<variant>/.
-    """
-    from jinja2 import TemplateNotFound  # just in case import above changes
 
-    variant = getattr(request.state, "variant", None)
-    ctx = dict(context)  # copy to avoid surprises
-    ctx.setdefault("current_variant", variant)
-
-    # Try variant-specific template first
-    if variant:
-        variant_path = f"variants/{variant}/{template_name}"
-        try:
-            return templates.TemplateResponse(variant_path, ctx)
-        except TemplateNotFound:
-            # silently fall back
-            pass
-
-    # Fall back to default template
-    try:
-        return templates.TemplateResponse(template_name, ctx)
-    except TemplateNotFound:
-        raise HTTPException(status_code=500, detail=f"Template not found: {template_name}")
+    The rendered HTML is cached by (template, variant, URL path,
+    cache_params, cache_version) and the set of variant overrides in use,
+    so a page must be fully determined by those: pass the query parameters
+    the page depends on as `cache_params` (the rest of the query string is
+    ignored), and a new `cache_version` (e.g. the initiatives data version)
+    whenever the underlying data changes.
+    Responses carry a strong ETag and `If-None-Match` is answered with a 304.
+    """
+    body, etag = _cached_render(request, template_name, context, cache_version, cache_params)
+    headers = {
+        "ETag": etag,
+        # Always revalidate: the page depends on the variant cookie
+        "Cache-Control": "no-cache",
+        "Vary": "Cookie",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
 
 
 def jinja_load_variant_template(template_html: str, variant: str | None = None) -> str:
@@ -58,17 +203,13 @@ def jinja_load_variant_template(template_html: str, variant: str | None = None)
     Returns the best template path for an include:
     - If variant is set and variants/<variant>/<template_html> exists, return that
     - Otherwise return template_html
+
+    The lookup goes through the precomputed table in app/variants.py.
     """
-    if variant:
-        candidate = f"variants/{variant}/{template_html}"
-        try:
-            templates.env.get_template(candidate)
-            return candidate
-        except TemplateNotFound:
-            # fall back to default
-            pass
-    return template_html
+    return template_resolver.resolve(template_html, variant)
 
 
 # register helper as a global in Jinja
 templates.env.globals["jinja_load_variant_template"] = jinja_load_variant_template
+# Hashed URLs for fingerprinted static assets (see app/assets.py)
+templates.env.globals["url_for"] = assets.url_for
@@ -0,0 +1,270 @@
+# app/ingest.py
+import asyncio
+import json
+import logging
+import time
+from typing import Any
+
+from sqlalchemy import JSON, insert
+
+from . import metrics, partitions
+from .config import settings
+from .db import AsyncSessionLocal, async_engine
+from .models import ABAssignment, Event, PageView
+
+logger = logging.getLogger(__name__)
+
+# Marker pushed into the queue by `stop()` so the flusher knows it must
+# write what it has and exit.
+_STOP = object()
+
+
+class BatchWriter:
+    """Write-behind buffer that inserts rows of one model in bulk.
+
+    - Requests call `submit(row)` / `submit_many(rows)`, which only put the
+      rows on an asyncio queue. Rows submitted together stay together and
+      always end up in the same transaction.
+    - A background task drains the queue and inserts the rows with a single
+      executemany INSERT + one commit, as soon as `batch_size` rows are
+      waiting or `flush_interval` seconds have passed since the first one.
+    - The queue is bounded (`max_queue` submissions). When full,
+      `policy="drop"` discards the rows (and counts them) while
+      `policy="block"` makes the request wait.
+    - A batch that fails to write is retried `retries` times, with a
+      `retry_backoff` delay doubling each time, before it is given up.
+      Rows dropped because the queue was full (`dropped`), rows given up
+      after the retries (`failed`) and failed attempts (`write_errors`)
+      are counted apart.
+    - `stop()` drains everything still queued, so worker restarts don't lose rows.
+
+    Inserts go through the async engine (app/db.py), so flushing never
+    ties up a threadpool worker. Rows go to their monthly partition (see
+    app/partitions.py); on PostgreSQL a batch is sent with COPY instead of
+    an INSERT. If the writer was never started (scripts, tests without
+    lifespan) rows are written right away.
+    """
+
+    def __init__(
+        self,
+        model,
+        batch_size: int,
+        flush_interval: float,
+        max_queue: int,
+        policy: str = "drop",
+        retries: int = 3,
+        retry_backoff: float = 0.5,
+    ):
+        self.model = model
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.policy = policy
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.dropped = 0
+        self.failed = 0
+        self.write_errors = 0
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        if metrics.ENABLED:
+            table = model.__tablename__
+            self._depth = metrics.INGEST_QUEUE_DEPTH.labels(table)
+            self._flush_latency = metrics.INGEST_FLUSH_LATENCY.labels(table)
+            self._write_errors = metrics.INGEST_WRITE_ERRORS.labels(table)
+            self._rows = {
+                outcome: metrics.INGEST_ROWS.labels(table, outcome)
+                for outcome in ("written", "dropped", "failed")
+            }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush every queued row and stop the background task."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        self._queue = None
+        if metrics.ENABLED:
+            self._depth.set(0)
+
+    async def submit(self, row: dict[str, Any]) -> bool:
+        """Queue a row for insertion. Returns False if it was dropped."""
+        return await self.submit_many([row])
+
+    async def submit_many(self, rows: list[dict[str, Any]]) -> bool:
+        """Queue rows to be inserted in one transaction. Returns False if dropped."""
+        if not rows:
+            return True
+
+        if not self.running:
+            await self._write(rows)
+            return True
+
+        if self.policy == "block":
+            await self._queue.put(rows)
+        else:
+            try:
+                self._queue.put_nowait(rows)
+            except asyncio.QueueFull:
+                self.dropped += len(rows)
+                if metrics.ENABLED:
+                    self._rows["dropped"].inc(len(rows))
+                logger.warning(
+                    "%s queue full (%d submissions), dropping %d rows (dropped so far: %d)",
+                    self.model.__tablename__, self.max_queue, len(rows), self.dropped,
+                )
+                return False
+        if metrics.ENABLED:
+            self._depth.set(self._queue.qsize())
+        return True
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = list(item)
+            deadline = loop.time() + self.flush_interval
+
+            # Keep collecting until the batch is full or the interval is over
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.extend(item)
+
+            if metrics.ENABLED:
+                self._depth.set(self._queue.qsize())
+            await self._flush(batch)
+
+        # Anything left behind the stop marker (put by blocked producers)
+        batch = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is _STOP:
+                continue
+            batch.extend(item)
+            if len(batch) >= self.batch_size:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[dict[str, Any]]) -> None:
+        start = time.perf_counter()
+        table = self.model.__tablename__
+        delay = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            try:
+                await self._write(batch)
+            except Exception:
+                # Never let a bad batch kill the flusher
+                self.write_errors += 1
+                if metrics.ENABLED:
+                    self._write_errors.inc()
+                if attempt < self.retries:
+                    logger.warning(
+                        "Failed to write %d rows to %s, retrying in %.1fs (%d/%d)",
+                        len(batch), table, delay, attempt + 1, self.retries, exc_info=True,
+                    )
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                    continue
+                self.failed += len(batch)
+                logger.exception(
+                    "Failed to write %d rows to %s after %d retries, dropping them "
+                    "(failed so far: %d)", len(batch), table, self.retries, self.failed,
+                )
+                outcome = "failed"
+            else:
+                outcome = "written"
+            break
+        if metrics.ENABLED:
+            self._flush_latency.observe(time.perf_counter() - start)
+            self._rows[outcome].inc(len(batch))
+
+    async def _write(self, rows: list[dict[str, Any]]) -> None:
+        groups = partitions.route(self.model, rows)
+        for table, _ in groups:
+            await partitions.ensure(table)
+        async with AsyncSessionLocal() as db:
+            for table, group in groups:
+                if async_engine.dialect.name == "postgresql":
+                    await self._copy(db, table, group)
+                else:
+                    await db.execute(insert(table), group)
+            await db.commit()
+
+    async def _copy(self, db, table, rows: list[dict[str, Any]]) -> None:
+        """COPY the rows in (asyncpg's binary protocol): one round trip, no
+        statement to parse, far less per-row work than an executemany INSERT."""
+        names = list(rows[0])
+        as_json = [isinstance(table.c[name].type, JSON) for name in names]
+        records = [
+            tuple(
+                json.dumps(value) if is_json and value is not None else value
+                for value, is_json in zip((row.get(name) for name in names), as_json)
+            )
+            for row in rows
+        ]
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(table.name, records=records, columns=names)
+
+
+event_writer = BatchWriter(
+    Event,
+    batch_size=settings.TRACK_BATCH_SIZE,
+    flush_interval=settings.TRACK_FLUSH_INTERVAL,
+    max_queue=settings.TRACK_QUEUE_MAXSIZE,
+    policy=settings.TRACK_QUEUE_POLICY,
+    retries=settings.TRACK_WRITE_RETRIES,
+    retry_backoff=settings.TRACK_RETRY_BACKOFF,
+)
+
+# Page views and variant assignments are written by the middleware on
+# every page load, so they get the same treatment (and settings).
+page_view_writer = BatchWriter(
+    PageView,
+    batch_size=settings.TRACK_BATCH_SIZE,
+    flush_interval=settings.TRACK_FLUSH_INTERVAL,
+    max_queue=settings.TRACK_QUEUE_MAXSIZE,
+    policy=settings.TRACK_QUEUE_POLICY,
+    retries=settings.TRACK_WRITE_RETRIES,
+    retry_backoff=settings.TRACK_RETRY_BACKOFF,
+)
+
+assignment_writer = BatchWriter(
+    ABAssignment,
+    batch_size=settings.TRACK_BATCH_SIZE,
+    flush_interval=settings.TRACK_FLUSH_INTERVAL,
+    max_queue=settings.TRACK_QUEUE_MAXSIZE,
+    policy=settings.TRACK_QUEUE_POLICY,
+    retries=settings.TRACK_WRITE_RETRIES,
+    retry_backoff=settings.TRACK_RETRY_BACKOFF,
+)
@@ -0,0 +1,171 @@
+# app/initiatives.py
+import bisect
+import json
+import re
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from . import metrics
+
+CARDS_FILE = Path(__file__).parent / "routes" / "cards.json"
+# Text searched by InitiativeRepository.search()
+SEARCH_FIELDS = ("title", "short_description", "full_description", "categories")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip accents, like `normalize()` in front-end.js."""
+    decomposed = unicodedata.normalize("NFD", str(text or "").lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+# Words of normalize_text() output, for the search index and queries
+_WORD = re.compile(r"\w+")
+
+
+class SearchPage(NamedTuple):
+    items: List[Dict[str, Any]]
+    total: int  # matches across all pages
+    # (lowercased status, status as written, matches), ignoring the status filter
+    status_counts: List[Tuple[str, str, int]]
+    version: int  # of the cards.json snapshot searched
+
+
+class _Snapshot:
+    """Immutable view of cards.json plus the indexes built from it."""
+
+    def __init__(self, items: List[Dict[str, Any]], mtime: float, version: int):
+        self.items = items
+        self.mtime = mtime
+        self.version = version
+        self.by_id: Dict[int, Dict[str, Any]] = {}
+        # Inverted index over SEARCH_FIELDS: token -> positions in `items`,
+        # ascending. `vocabulary` is sorted, so prefixes are a bisect away.
+        self.postings: Dict[str, List[int]] = {}
+        self.statuses: List[str] = []  # lowercased, per position in `items`
+        self.status_labels: Dict[str, str] = {}  # lowercased -> as written in cards.json
+
+        for position, item in enumerate(items):
+            self.by_id[item["id"]] = item
+            # Same key the filter bar uses: data-initiative-status="{{ status | lower }}"
+            status = str(item.get("status", "")).lower()
+            self.statuses.append(status)
+            self.status_labels.setdefault(status, str(item.get("status", "")))
+
+            texts = []
+            for field in SEARCH_FIELDS:
+                value = item.get(field) or ""
+                texts.extend(value if isinstance(value, list) else [value])
+            for token in set(_WORD.findall(normalize_text(" ".join(map(str, texts))))):
+                self.postings.setdefault(token, []).append(position)
+
+        self.vocabulary = sorted(self.postings)
+
+    def prefix_matches(self, prefix: str) -> set:
+        """Positions of the items with a token starting with `prefix`."""
+        positions = set()
+        i = bisect.bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            positions.update(self.postings[self.vocabulary[i]])
+            i += 1
+        return positions
+
+
+class InitiativeRepository:
+    """In-memory access to the initiatives stored in cards.json.
+
+    The file is parsed once and kept in memory together with an index by
+    `id` and by word (see `search`). It is re-read only when its mtime
+    changes, and the mtime itself is checked at most once every
+    `check_interval` seconds, so steady-state lookups do no file I/O.
+    """
+
+    def __init__(self, path: Path = CARDS_FILE, check_interval: float = 2.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._next_check = 0.0
+
+    def _current(self) -> _Snapshot:
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now < self._next_check:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and now < self._next_check:
+                return snapshot
+
+            mtime = self.path.stat().st_mtime
+            if snapshot is None or mtime != snapshot.mtime:
+                start = time.perf_counter()
+                with open(self.path, "r") as read_file:
+                    data = json.load(read_file)
+                version = snapshot.version + 1 if snapshot else 1
+                snapshot = _Snapshot(data, mtime, version)
+                self._snapshot = snapshot
+                if metrics.ENABLED:
+                    metrics.INITIATIVES_LOAD_LATENCY.observe(time.perf_counter() - start)
+
+            self._next_check = now + self.check_interval
+            return snapshot
+
+    @property
+    def version(self) -> int:
+        """Bumped every time cards.json is reloaded."""
+        return self._current().version
+
+    def all(self) -> List[Dict[str, Any]]:
+        return self._current().items
+
+    def get(self, initiative_id: int) -> Optional[Dict[str, Any]]:
+        return self._current().by_id.get(initiative_id)
+
+    def get_with_version(self, initiative_id: int) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Like `get`, plus the version of the snapshot the item came from."""
+        snapshot = self._current()
+        return snapshot.by_id.get(initiative_id), snapshot.version
+
+    def search(
+        self,
+        query: str = "",
+        status: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> SearchPage:
+        """One page of the initiatives matching `query` and `status`, in file order.
+
+        Every word of `query` must start a word of the title, descriptions
+        or categories (accent- and case-insensitive), so results narrow as
+        the user types. `status_counts` are the facet counts for the query
+        alone, so the filter bar can show what each status would return.
+        """
+        snapshot = self._current()
+        positions = None
+        for word in _WORD.findall(normalize_text(query)):
+            matches = snapshot.prefix_matches(word)
+            positions = matches if positions is None else positions & matches
+        matched = range(len(snapshot.items)) if positions is None else sorted(positions)
+
+        counts: Dict[str, int] = {}
+        for position in matched:
+            key = snapshot.statuses[position]
+            counts[key] = counts.get(key, 0) + 1
+
+        if status:
+            status = status.lower()
+            matched = [p for p in matched if snapshot.statuses[p] == status]
+        end = None if limit is None else offset + limit
+        return SearchPage(
+            items=[snapshot.items[p] for p in matched[offset:end]],
+            total=len(matched),
+            status_counts=[(key, snapshot.status_labels[key], n) for key, n in counts.items()],
+            version=snapshot.version,
+        )
+
+
+initiatives = InitiativeRepository()
@@ -1,17 +1,28 @@
-import random
 import uuid
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
 
-from fastapi import FastAPI, Request, Response
-from fastapi.staticfiles import StaticFiles
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import FastAPI
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from . import metrics
+from .assets import PrecompressedStaticFiles
 from .config import settings
-from .db import Base, engine, SessionLocal
-from .models import ABAssignment, PageView
-from .routes import pages, api
-from .variants import get_available_variants
+from .db import Base, async_engine, engine
+from .ingest import assignment_writer, event_writer, page_view_writer
+from .routes import pages, api, analytics
+from .routes import metrics as metrics_routes
+from .variants import VariantAssigner, get_available_variants, template_resolver
 
 VARIANTS = get_available_variants()
+assigner = VariantAssigner(
+    VARIANTS,
+    weights=settings.AB_VARIANT_WEIGHTS,
+    mode=settings.AB_ASSIGNMENT_MODE,
+    salt=settings.AB_HASH_SALT,
+)
 
 def init_db():
     """Initialize database tables on startup.
@@ -21,85 +32,160 @@ def init_db():
     Base.metadata.create_all(bind=engine)
 
 
-class SessionVariantMiddleware(BaseHTTPMiddleware):
+def _cookie_header(name: str, value: str, httponly: bool) -> str:
+    """Builds a `Set-Cookie` value equivalent to `Response.set_cookie`."""
+    cookie = SimpleCookie()
+    cookie[name] = value
+    cookie[name]["path"] = "/"
+    cookie[name]["samesite"] = "lax"
+    if httponly:
+        cookie[name]["httponly"] = True
+    return cookie.output(header="").strip()
+
+
+def _valid_session_id(value: str | None) -> bool:
+    """Session IDs are UUIDs we issued; anything else gets replaced."""
+    if not value:
+        return False
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+class SessionVariantMiddleware:
     """Assigns an anonymous session ID and an A/B test variant.
 
-    - If the visitor has no `session_id` cookie, a UUID is created.
-    - If the visitor has no `ab_variant` cookie, one is chosen randomly.
+    - If the visitor has no valid `session_id` cookie, a UUID is created.
+    - If the visitor's `ab_variant` cookie is missing or names a variant
+      that no longer exists, one is chosen by `assigner` (hash of the
+      session ID by default, see AB_ASSIGNMENT_MODE).
     - Page views are logged along with the chosen variant.
 
-    This middleware is intentionally simple and self-contained so the
-    A/B mechanism is easy to understand and maintain.
-    """
-
-    async def dispatch(self, request: Request, call_next):
-        response: Response
+    Cookies are only sent when one of them was (re)issued: returning
+    visitors get no Set-Cookie headers, and their non-GET requests
+    (/api/track beacons) go through untouched.
 
-        session_id = request.cookies.get(settings.COOKIE_SESSION_NAME)
-        variant = request.cookies.get(settings.COOKIE_VARIANT_NAME)
+    Written as a plain ASGI middleware so nothing here blocks the event
+    loop: assignments and page views are handed to the background
+    writers in app/ingest.py. Paths in SESSION_SKIP_PREFIXES (static
+    files, /metrics and /api/analytics: scrapers and dashboards are not
+    visitors) skip the middleware entirely.
+    """
 
-        db = SessionLocal()
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.skip_prefixes = tuple(settings.SESSION_SKIP_PREFIXES)
+        self.variants = frozenset(VARIANTS)
+        # Same header for every visitor of a variant, so built once
+        self.variant_cookies = {
+            v: _cookie_header(settings.COOKIE_VARIANT_NAME, v, httponly=False)
+            for v in VARIANTS
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        conn = HTTPConnection(scope)
+        session_id = conn.cookies.get(settings.COOKIE_SESSION_NAME)
+        variant = conn.cookies.get(settings.COOKIE_VARIANT_NAME)
+        cookies = []
 
         # Create a new anonymous session if needed
-        if not session_id:
+        if not _valid_session_id(session_id):
             session_id = str(uuid.uuid4())
+            cookies.append(
+                _cookie_header(settings.COOKIE_SESSION_NAME, session_id, httponly=True)
+            )
 
-        # Assign an A/B variant if not already set
-        if not variant:
-            variant = random.choice(VARIANTS)
-            assignment = ABAssignment(session_id=session_id, variant_name=variant)
-            db.add(assignment)
-            db.commit()
+        # Assign an A/B variant if not already set (or no longer served)
+        if variant not in self.variants:
+            variant = assigner.assign(session_id)
+            cookies.append(self.variant_cookies[variant])
+            if settings.AB_RECORD_ASSIGNMENTS:
+                await assignment_writer.submit({
+                    "session_id": session_id,
+                    "variant_name": variant,
+                    "created_at": datetime.now(timezone.utc),
+                })
 
         # Store on request state for use in routes/templates
-        request.state.session_id = session_id
-        request.state.variant = variant
-
-        response = await call_next(request)
-
-        # Set cookies so the browser persists session + variant
-        response.set_cookie(
-            settings.COOKIE_SESSION_NAME,
-            session_id,
-            httponly=True,
-            samesite="lax",
-        )
-        response.set_cookie(
-            settings.COOKIE_VARIANT_NAME,
-            variant,
-            httponly=False,
-            samesite="lax",
-        )
-
-        # Log page view for HTML responses
-        content_type = response.headers.get("content-type", "")
-        if request.method == "GET" and "text/html" in content_type:
-            pv = PageView(
-                session_id=session_id,
-                page=request.url.path,
-                variant_name=variant,
-            )
-            db.add(pv)
-            db.commit()
+        conn.state.session_id = session_id
+        conn.state.variant = variant
+
+        # Nothing to add to the response: no page view, no cookies
+        if scope["method"] != "GET" and not cookies:
+            await self.app(scope, receive, send)
+            return
 
-        db.close()
-        return response
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+
+                # Set cookies so the browser persists session + variant
+                for cookie in cookies:
+                    headers.append("set-cookie", cookie)
+
+                # Log page view for HTML responses (a 304 is a cached HTML page)
+                content_type = headers.get("content-type", "")
+                is_page = "text/html" in content_type or message["status"] == 304
+                if scope["method"] == "GET" and is_page:
+                    await page_view_writer.submit({
+                        "session_id": session_id,
+                        "page": scope["path"],
+                        "variant_name": variant,
+                        "timestamp": datetime.now(timezone.utc),
+                    })
+
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
 
 
 app = FastAPI(title=settings.FASTAPI_NAME)
 
 # Static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory="app/static"), name="static")
 
 # Middleware
 app.add_middleware(SessionVariantMiddleware)
+if metrics.ENABLED:
+    # Added last = outermost, so request latency includes the middleware above
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(engine, "sync")
+    metrics.instrument_engine(async_engine.sync_engine, "async")
 
 
 @app.on_event("startup")
 def on_startup():
     init_db()
+    template_resolver.refresh()
+
+
+@app.on_event("startup")
+async def start_writers():
+    await event_writer.start()
+    await page_view_writer.start()
+    await assignment_writer.start()
+
+
+@app.on_event("shutdown")
+async def stop_writers():
+    # Drain queued rows before the worker exits
+    await event_writer.stop()
+    await page_view_writer.stop()
+    await assignment_writer.stop()
+    await async_engine.dispose()
 
 
 # Routers
 app.include_router(pages.router)
 app.include_router(api.router, prefix="/api")
+if settings.ANALYTICS_API_TOKEN:
+    # Arbitrary GROUP BYs over the event history: never public
+    app.include_router(analytics.router, prefix="/api/analytics")
+if metrics.ENABLED:
+    app.include_router(metrics_routes.router)
@@ -0,0 +1,190 @@
+# app/metrics.py
+"""Prometheus metrics: request latency, DB queries, template renders and
+the write-behind queues.
+
+Under gunicorn every worker records into files in PROMETHEUS_MULTIPROC_DIR
+(prometheus_client's multiprocess mode, see gunicorn.conf.py) and
+GET /metrics, answered by whichever worker gets it, adds them all up.
+Without that variable (one uvicorn process) the in-memory registry is used.
+
+With METRICS_ENABLED off, or no METRICS_TOKEN to read them with, nothing is
+installed: no middleware, no SQLAlchemy hooks, no /metrics route, and the
+call sites in the app skip on a single `if metrics.ENABLED`.
+"""
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+# /metrics is never public, so without a token nobody could read them
+ENABLED = settings.METRICS_ENABLED and bool(settings.METRICS_TOKEN)
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    # prometheus_client opens its files here as soon as a metric has a value
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import (  # noqa: E402  (must see PROMETHEUS_MULTIPROC_DIR)
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Most SQLite queries and template renders finish in well under 5 ms,
+# below the first default bucket
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Statement label values; anything else (PRAGMA, SAVEPOINT...) is "OTHER"
+STATEMENTS = {"SELECT", "INSERT", "UPDATE", "DELETE", "CREATE", "DROP", "ALTER"}
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve a request, by route template",
+    ["method", "route"],
+)
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests served, by route template and status",
+    ["method", "route", "status"],
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Time spent in cursor.execute, by engine and statement type",
+    ["engine", "statement"],
+    buckets=FAST_BUCKETS,
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors_total",
+    "Statements that raised",
+    ["engine"],
+)
+TEMPLATE_RENDER_LATENCY = Histogram(
+    "template_render_duration_seconds",
+    "Time to render a page template (render cache misses only)",
+    ["template"],
+    buckets=FAST_BUCKETS,
+)
+RENDER_CACHE = Counter(
+    "render_cache_requests_total",
+    "render_variant_template lookups, by hit or miss",
+    ["result"],
+)
+INITIATIVES_LOAD_LATENCY = Histogram(
+    "initiatives_load_duration_seconds",
+    "Time to read cards.json and rebuild its indexes",
+    buckets=FAST_BUCKETS,
+)
+INGEST_QUEUE_DEPTH = Gauge(
+    "ingest_queue_depth",
+    "Submissions waiting in a write-behind queue (summed over live workers)",
+    ["table"],
+    multiprocess_mode="livesum",
+)
+INGEST_FLUSH_LATENCY = Histogram(
+    "ingest_flush_duration_seconds",
+    "Time to write one batch from a write-behind queue",
+    ["table"],
+    buckets=FAST_BUCKETS,
+)
+INGEST_ROWS = Counter(
+    "ingest_rows_total",
+    "Rows handled by the write-behind queues, by outcome (written, dropped: "
+    "queue full, failed: given up after every retry)",
+    ["table", "outcome"],
+)
+INGEST_WRITE_ERRORS = Counter(
+    "ingest_write_errors_total",
+    "Failed attempts to write a batch from a write-behind queue (retried or not)",
+    ["table"],
+)
+
+
+def route_label(scope: Scope) -> str:
+    """The matched route template (`/initiatives/{initiative_id}`), never the
+    raw path, so that the number of series stays bounded."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounts (/static) only leave their prefix behind
+    return scope.get("root_path") or "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Times every HTTP request, SessionVariantMiddleware included."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # (method, route, status) -> children; labels() takes a lock every call
+        self._series: dict = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500  # if the app raises before responding
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            key = (scope["method"], route_label(scope), status)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = (
+                    REQUEST_LATENCY.labels(key[0], key[1]),
+                    REQUESTS.labels(key[0], key[1], str(status)),
+                )
+            series[0].observe(elapsed)
+            series[1].inc()
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Times every statement run through `engine` (the sync engine of an
+    AsyncEngine for async code). asyncpg COPY doesn't go through here; it
+    shows up in ingest_flush_duration_seconds."""
+
+    latency = {verb: DB_QUERY_LATENCY.labels(name, verb) for verb in STATEMENTS | {"OTHER"}}
+
+    # A stack rather than one slot: statements can nest (e.g. pre-ping)
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_start"].pop()
+        verb = (statement.split(None, 1) or ["?"])[0].upper()
+        latency.get(verb, latency["OTHER"]).observe(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_start"):
+            conn.info["metrics_start"].pop()
+        DB_QUERY_ERRORS.labels(name).inc()
+
+
+def render() -> tuple[bytes, str]:
+    """(body, content type) of the current metrics of every worker."""
+    registry = REGISTRY
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
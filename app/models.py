@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Text
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from .db import Base
 
@@ -13,23 +14,49 @@ class ABAssignment(Base):
 
 class PageView(Base):
     __tablename__ = "page_views"
+    # Covering indexes for analytics_cli.py (see migrations/versions/)
+    __table_args__ = (
+        Index("ix_page_views_page_variant", "page", "variant_name"),  # pageviews, conversion
+        Index("ix_page_views_variant_page", "variant_name", "page"),  # summary
+        Index("ix_page_views_session_timestamp", "session_id", "timestamp"),  # funnel
+        Index("ix_page_views_page_timestamp", "page", "timestamp"),  # --since/--until by page
+        Index("ix_page_views_timestamp", "timestamp"),  # --since/--until, summary
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String(64), index=True)
-    page = Column(String(255), index=True)
-    variant_name = Column(String(50), index=True)
+    session_id = Column(String(64))
+    page = Column(String(255))
+    variant_name = Column(String(50))
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
 
 class Event(Base):
     __tablename__ = "events"
+    # Covering indexes for analytics_cli.py (see migrations/versions/)
+    __table_args__ = (
+        # events, events-detailed, events-like
+        Index("ix_events_event_variant_session", "event_name", "variant_name", "session_id"),
+        # conversion
+        Index("ix_events_event_page_variant", "event_name", "page_url", "variant_name"),
+        # summary
+        Index("ix_events_variant_event", "variant_name", "event_name"),
+        # contact-forms
+        Index("ix_events_event_timestamp", "event_name", "timestamp"),
+        # recent
+        Index("ix_events_timestamp", "timestamp"),
+        # funnel
+        Index("ix_events_session_timestamp", "session_id", "timestamp"),
+        # metadata containment queries (metadata @> '{...}'), PostgreSQL only
+        Index("ix_events_metadata_gin", "metadata", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String(64), index=True)
-    event_name = Column(String(100), index=True)
+    session_id = Column(String(64))
+    event_name = Column(String(100))
     page_url = Column(String(255), index=True)
-    variant_name = Column(String(50), index=True)
-    event_metadata = Column("metadata", JSON, nullable=True)  # column called "metadata" in DB
+    variant_name = Column(String(50))
+    # column called "metadata" in DB; JSONB on PostgreSQL so it can be indexed
+    event_metadata = Column("metadata", JSON().with_variant(JSONB(), "postgresql"), nullable=True)
     referrer = Column(Text, nullable=True)
     user_agent = Column(Text, nullable=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
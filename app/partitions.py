@@ -0,0 +1,105 @@
+# app/partitions.py
+"""Monthly partitions of the append-only tables (events, page_views).
+
+Rows are written to one table per calendar month (UTC) of their
+`timestamp`: events_2025_03, page_views_2025_03, ... Each partition is a
+copy of the model's table, indexes included, created the first time a row
+for that month arrives; ids count up per table, so (table, id) is the key.
+The base tables stay in place: they hold the rows written before
+partitioning (or with PARTITION_MONTHLY off), and
+analytics_queries.partitions() reads base + partitions as one table.
+
+Partitions are cloned from the models as they are when the partition is
+created, not from the migrations. A migration that changes `events` or
+`page_views` (a new index, say) only reaches partitions created after it
+ships, so it must apply the same DDL to the existing ones itself:
+
+    for name in partitions.existing_partitions(op.get_bind(), "events"):
+        op.create_index(f"ix_{name}_foo", name, ["foo"])
+
+Old months are archived and dropped with `analytics_cli.py archive`.
+"""
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import Connection, MetaData, Table, inspect
+from sqlalchemy.exc import DBAPIError
+
+from .config import settings
+from .db import async_engine
+
+logger = logging.getLogger(__name__)
+
+# Tables split by month; partitions are named <table>_<YYYY_MM>
+# (the format must match analytics_queries.PARTITION_RE)
+PARTITIONED = {"events", "page_views"}
+SUFFIX_FORMAT = "%Y_%m"
+
+_metadata = MetaData()
+_created: set[str] = set()
+
+
+def partition_table(base: Table, suffix: str) -> Table:
+    """The `<base>_<suffix>` copy of `base`, with its indexes renamed to match."""
+    name = f"{base.name}_{suffix}"
+    table = _metadata.tables.get(name)
+    if table is None:
+        table = base.to_metadata(_metadata, name=name)
+        for index in table.indexes:
+            # Named indexes are copied verbatim; index names are per schema
+            if index.name.startswith(f"ix_{base.name}_") and not index.name.startswith(f"ix_{name}_"):
+                index.name = f"ix_{name}_{index.name[len(base.name) + 4:]}"
+            # to_metadata() drops ddl_if(); GIN indexes are PostgreSQL-only
+            if index.dialect_kwargs.get("postgresql_using"):
+                index.ddl_if(dialect="postgresql")
+    return table
+
+
+def route(model, rows: list[dict[str, Any]]) -> list[tuple[Table, list[dict[str, Any]]]]:
+    """Groups rows by the table they belong in.
+
+    Rows come keyed by model attribute (`event_metadata`) and leave keyed by
+    column name (`metadata`), ready for insert(table) or COPY.
+    """
+    base = model.__table__
+    names = {key: model.__mapper__.columns[key].name for key in rows[0]}
+    groups: dict[str, tuple[Table, list]] = {}
+    for row in rows:
+        table = base
+        if settings.PARTITION_MONTHLY and base.name in PARTITIONED:
+            ts = row.get("timestamp") or datetime.now(timezone.utc)
+            table = partition_table(base, ts.astimezone(timezone.utc).strftime(SUFFIX_FORMAT))
+        groups.setdefault(table.name, (table, []))[1].append(
+            {names[key]: value for key, value in row.items()}
+        )
+    return list(groups.values())
+
+
+def existing_partitions(conn: Connection, base: str) -> list[str]:
+    """Names of the partitions of `base` in the database behind `conn`
+    (a sync connection, e.g. op.get_bind() in a migration)."""
+    pattern = re.compile(rf"{re.escape(base)}_\d{{4}}_\d{{2}}")
+    return sorted(name for name in inspect(conn).get_table_names() if pattern.fullmatch(name))
+
+
+async def ensure(table: Table) -> None:
+    """Creates a partition (and its indexes) if this process hasn't seen it yet.
+
+    Runs in its own transaction so that losing a creation race against
+    another worker never fails the batch being written.
+    """
+    if table.name in _created or table.name not in _metadata.tables:
+        return
+    try:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(table.create, checkfirst=True)
+    except DBAPIError:
+        async with async_engine.connect() as conn:
+            exists = await conn.run_sync(lambda sync: inspect(sync).has_table(table.name))
+        if not exists:
+            raise
+        logger.info("Partition %s was created by another worker", table.name)
+    _created.add(table.name)
+
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+import analytics_queries as queries
+
+from ..config import settings
+from ..deps import require_bearer_token
+
+
+class ResultCache:
+    """Short-TTL cache of computed results with single-flight.
+
+    Concurrent misses for the same key share one computation (run in the
+    threadpool) instead of each running the same GROUP BYs. Only successful
+    results are cached. Everything runs on the event loop, so no lock.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._inflight: dict = {}  # key -> asyncio.Task
+
+    async def get_or_compute(self, key, compute: Callable[[], Any]):
+        entry = self._data.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(run_in_threadpool(compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        # A client that disconnects must not cancel the others' computation
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None or self.ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, task.result())
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+result_cache = ResultCache(settings.ANALYTICS_CACHE_TTL, settings.ANALYTICS_CACHE_SIZE)
+
+
+# Without ANALYTICS_API_TOKEN nobody gets in (and main.py does not even
+# mount the router)
+router = APIRouter(dependencies=[Depends(require_bearer_token("ANALYTICS_API_TOKEN"))])
+
+Bucket = Literal["hour", "day", "week"]
+
+
+def _window(since: str | None, until: str | None) -> dict:
+    try:
+        return {
+            "since": queries.parse_time(since) if since else None,
+            "until": queries.parse_time(until, end=True) if until else None,
+        }
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+def _run(query: Callable, *args, **kwargs):
+    """Runs one shared query on a fresh read-only connection (in a worker thread)."""
+    try:
+        conn = queries.connect(settings.DB_URL)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="Analytics database not found")
+    try:
+        if kwargs.get("use_rollups") and not queries.table_exists(conn, "rollup_state"):
+            raise HTTPException(
+                status_code=409, detail="No rollups found. Run `python analytics_cli.py rollup` first."
+            )
+        return query(conn, *args, **kwargs)
+    finally:
+        conn.close()
+
+
+async def _cached_json(key: tuple, build: Callable[[], dict]) -> Response:
+    """JSON response for `build()`; the encoded body is what gets cached."""
+    body = await result_cache.get_or_compute(
+        key, lambda: json.dumps(build(), separators=(",", ":")).encode()
+    )
+    return Response(body, media_type="application/json")
+
+
+@router.get("/summary")
+async def summary(
+    since: str | None = None,
+    until: str | None = None,
+    bucket: Bucket | None = None,
+    rollups: bool = False,
+):
+    """Same numbers as `analytics_cli.py summary`."""
+    window = _window(since, until)
+
+    def build():
+        events, page_views = _run(queries.summary_rows, use_rollups=rollups, **window, bucket=bucket)
+        return {"events": events, "page_views": page_views}
+
+    return await _cached_json(("summary", rollups, *window.values(), bucket), build)
+
+
+@router.get("/conversion")
+async def conversion(
+    event: str,
+    page: str,
+    since: str | None = None,
+    until: str | None = None,
+    bucket: Bucket | None = None,
+    rollups: bool = False,
+):
+    """Same numbers as `analytics_cli.py conversion`."""
+    window = _window(since, until)
+
+    def build():
+        rows = _run(queries.conversion_rows, event, page, use_rollups=rollups, **window, bucket=bucket)
+        return {"event": event, "page": page, "variants": rows}
+
+    return await _cached_json(("conversion", event, page, rollups, *window.values(), bucket), build)
+
+
+@router.get("/events-like")
+async def events_like(
+    pattern: str = Query(..., description="SQL LIKE pattern, e.g. click_buy-now_%"),
+    since: str | None = None,
+    until: str | None = None,
+    bucket: Bucket | None = None,
+    rollups: bool = False,
+):
+    """Same numbers as `analytics_cli.py events-like`."""
+    window = _window(since, until)
+
+    def build():
+        rows = _run(queries.events_like_rows, pattern, use_rollups=rollups, **window, bucket=bucket)
+        return {"pattern": pattern, "events": rows}
+
+    return await _cached_json(("events-like", pattern, rollups, *window.values(), bucket), build)
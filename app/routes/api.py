@@ -1,14 +1,45 @@
-from fastapi import APIRouter, Request, UploadFile, File, Form
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Query, Request, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, Field
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import BinaryIO
 from uuid import uuid4
+import os
 
-from ..db import SessionLocal
+from .. import partitions
+from ..config import settings
+from ..db import get_db
+from ..deps import render_variant_fragment
+from ..ingest import event_writer
+from ..initiatives import initiatives
 from ..models import Event
 
 UPLOAD_DIR = Path("data/uploads/cv")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Upper bound for /api/track/batch (tracking.js flushes every 20 events)
+MAX_BATCH_EVENTS = 100
+# Upper bound for ?limit= on /api/initiatives
+MAX_INITIATIVES_PAGE = 100
+# Lo que ocupa el resto del formulario de /api/contact-upload (campos, boundaries)
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+# Tipos de archivo aceptados como CV, detectados por sus primeros bytes
+CV_SIGNATURES = [
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),  # .docx / .odt
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/msword"),  # .doc
+    (b"{\\rtf", "application/rtf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+]
+# Lo que ve el usuario (front-end.js muestra el `detail`) si el archivo no es ninguno
+UNSUPPORTED_CV_MESSAGE = "El CV tiene que ser un PDF, un documento de Word u OpenDocument, RTF o una imagen PNG/JPG"
+
 
 router = APIRouter()
 
@@ -18,6 +49,9 @@ class TrackEvent(BaseModel):
     variant: str | None = None
     metadata: dict | None = None
 
+class TrackBatch(BaseModel):
+    events: list[TrackEvent] = Field(..., max_length=MAX_BATCH_EVENTS)
+
 class ContactForm(BaseModel):
     nombre: str
     apellido: str
@@ -26,6 +60,98 @@ class ContactForm(BaseModel):
     iniciativa: str | None = None
     archivo_nombre: str | None = None
 
+def _event_row(event: TrackEvent, request: Request) -> dict:
+    """Builds an `events` row from a TrackEvent plus what the middleware knows."""
+    session_id = getattr(request.state, "session_id", None)
+    variant = event.variant or getattr(request.state, "variant", None)
+    metadata = event.metadata or {}
+
+    return {
+        "session_id": session_id,
+        "event_name": event.event_name,
+        "page_url": event.page,
+        "variant_name": variant,
+        "event_metadata": metadata,
+        "referrer": request.headers.get("referer"),
+        "user_agent": request.headers.get("user-agent"),
+        # Stamp it now: the INSERT may happen a while later
+        "timestamp": datetime.now(timezone.utc),
+    }
+
+async def _save_event(db: AsyncSession, row: dict) -> None:
+    """Inserts one event right away, bypassing event_writer.
+
+    For rows that must never be dropped by a full queue (contact forms).
+    """
+    for table, rows in partitions.route(Event, [row]):
+        await partitions.ensure(table)
+        await db.execute(insert(table), rows)
+    await db.commit()
+
+def _initiative_summary(item: dict, request: Request) -> dict:
+    """What a card shows; the full description stays on the detail page."""
+    return {
+        "id": item["id"],
+        "title": item.get("title"),
+        "status": item.get("status"),
+        "short_description": item.get("short_description"),
+        "categories": item.get("categories", []),
+        "responsable": item.get("responsable"),
+        "looking_for": item.get("looking_for"),
+        "url": str(request.url_for("initiative_detail", initiative_id=item["id"])),
+    }
+
+@router.get("/initiatives")
+def search_initiatives(
+    request: Request,
+    q: str = Query("", max_length=200),
+    status: str | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(settings.INITIATIVES_PAGE_SIZE, ge=1, le=MAX_INITIATIVES_PAGE),
+    html: bool = False,
+):
+    """Searches the initiatives in cards.json, one page at a time.
+
+    - `q`: every word must start a word of the title, descriptions or
+      categories, ignoring case and accents ("evaluacion" finds "Evaluación").
+    - `status`: as in the filter bar, e.g. "nuevo proyecto".
+    - `facets.status` counts the matches of `q` per status.
+    - `next_offset` is null on the last page.
+    - With `html=true` the cards are also returned rendered with the
+      visitor's variant templates, ready to insert in the grid.
+
+    Served from the in-memory index in app/initiatives.py, no file I/O.
+    Sync on purpose: rendering runs in the threadpool, like the pages.
+    """
+    page = initiatives.search(q, status or None, offset, limit)
+    next_offset = offset + len(page.items)
+
+    result = {
+        "total": page.total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset if next_offset < page.total else None,
+        "items": [_initiative_summary(item, request) for item in page.items],
+        "facets": {
+            "status": [
+                {"value": key, "label": label, "count": count}
+                for key, label, count in page.status_counts
+            ],
+        },
+    }
+    if html:
+        # Keyed on what the cards show, not on the query text: "inte",
+        # "intel" and "Inteligencia" often render the same cards. Empty
+        # results (no match, offset past the end) are not cached at all.
+        result["html"] = render_variant_fragment(
+            request,
+            "partials/initiative_cards.html",
+            {"request": request, "initiatives": page.items},
+            cache_version=page.version,
+            cache_params=tuple(item["id"] for item in page.items) or None,
+        )
+    return result
+
 @router.post("/track")
 async def track(event: TrackEvent, request: Request):
     """First-party analytics endpoint: stores interaction events.
@@ -34,30 +160,101 @@ async def track(event: TrackEvent, request: Request):
       (e.g. "click_buy-now_hero"). Any parsing is done later, outside this API.
     - `variant` may be provided by the client or injected via middleware
       into `request.state.variant`.
+    - The row is only queued here; `event_writer` inserts it in bulk
+      in the background (see app/ingest.py).
+    """
+    queued = await event_writer.submit(_event_row(event, request))
+
+    return {"status": "ok" if queued else "dropped"}
+
+@router.post("/track/batch")
+async def track_batch(batch: TrackBatch, request: Request):
+    """Bulk version of /track, used by tracking.js to send buffered events.
+
+    The whole list is validated first and then queued as one unit, so its
+    events are inserted in the same transaction.
     """
-    db = SessionLocal()
+    queued = await event_writer.submit_many(
+        [_event_row(event, request) for event in batch.events]
+    )
+
+    return {"status": "ok" if queued else "dropped", "count": len(batch.events)}
+
+def _sniff_cv_type(head: bytes) -> str | None:
+    for signature, content_type in CV_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+def _store_upload(src: BinaryIO, dest: Path) -> str | None:
+    """
+    Copia el archivo subido a `dest` en bloques de UPLOAD_CHUNK_SIZE.
+
+    - detecta el tipo con el primer bloque; si no es un CV reconocible
+      corta con un 415 (si está vacío no se guarda nada y devuelve None)
+    - corta apenas se supera UPLOAD_MAX_BYTES (413)
+    - escribe en un .part y lo renombra al final, así nunca queda
+      un archivo a medio escribir con el nombre definitivo
+
+    Es bloqueante: se llama con run_in_threadpool.
+    """
+    tmp_path = dest.with_name(f".{dest.name}.part")
+    written = 0
+    content_type = None
     try:
-        session_id = getattr(request.state, "session_id", None)
-        variant = event.variant or getattr(request.state, "variant", None)
-        metadata = event.metadata or {}
-
-        ev = Event(
-            session_id=session_id,
-            event_name=event.event_name,
-            page_url=event.page,
-            variant_name=variant,
-            event_metadata=metadata,
-            referrer=request.headers.get("referer"),
-            user_agent=request.headers.get("user-agent"),
-        )
-        db.add(ev)
-        db.commit()
+        with open(tmp_path, "wb") as out:
+            while chunk := src.read(settings.UPLOAD_CHUNK_SIZE):
+                if content_type is None:
+                    content_type = _sniff_cv_type(chunk)
+                    if content_type is None:
+                        raise HTTPException(status_code=415, detail=UNSUPPORTED_CV_MESSAGE)
+                written += len(chunk)
+                if written > settings.UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail="El archivo es demasiado grande")
+                out.write(chunk)
+        if content_type is not None:
+            os.replace(tmp_path, dest)
     finally:
-        db.close()
+        tmp_path.unlink(missing_ok=True)
+    return content_type
 
-    return {"status": "ok"}
 
-@router.post("/contact-upload")
+class UploadLimitRoute(APIRoute):
+    """
+    Corta el body con un 413 apenas supera UPLOAD_MAX_BYTES (+ el resto
+    del formulario).
+
+    FastAPI parsea el multipart, volcando el archivo a un
+    SpooledTemporaryFile, antes de llamar al handler: el límite tiene que
+    aplicarse mientras llega el body, no al copiar el archivo. Primero se
+    mira Content-Length y después se cuentan los bytes recibidos (para
+    los bodies chunked o con un Content-Length falso).
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request):
+            limit = settings.UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD
+            length = request.headers.get("content-length", "")
+            if length.isdigit() and int(length) > limit:
+                raise HTTPException(status_code=413, detail="El archivo es demasiado grande")
+
+            received = 0
+
+            async def receive():
+                nonlocal received
+                message = await request.receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > limit:
+                        raise HTTPException(status_code=413, detail="El archivo es demasiado grande")
+                return message
+
+            return await handler(Request(request.scope, receive))
+
+        return limited_handler
+
 async def contact_upload(
     request: Request,
     nombre: str = Form(...),
@@ -66,17 +263,21 @@ async def contact_upload(
     carrera: str = Form(...),
     iniciativa: str = Form(""),
     archivo: UploadFile | None = File(None),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Recibe el formulario de contacto + archivo y:
 
-    - guarda el CV en disco (data/uploads/cv)
+    - guarda el CV en disco (data/uploads/cv), en bloques y fuera del event loop;
+      un archivo que no es un CV reconocible se rechaza con un 415 (y el
+      formulario no se registra, para que el usuario lo mande de nuevo)
     - registra un evento 'contact_form_submitted' en la tabla events
       con todos los datos en metadata (incluyendo ruta del archivo)
     """
 
     archivo_nombre = None
     archivo_path = None
+    archivo_tipo = None
 
     if archivo is not None and archivo.filename:
         archivo_nombre = archivo.filename
@@ -89,11 +290,11 @@ async def contact_upload(
 
         full_path = UPLOAD_DIR / unique_name
 
-        # guardamos el archivo en disco
-        contents = await archivo.read()
-        full_path.write_bytes(contents)
+        # guardamos el archivo en disco sin cargarlo entero en memoria
+        archivo_tipo = await run_in_threadpool(_store_upload, archivo.file, full_path)
 
-        archivo_path = str(full_path)
+        if archivo_tipo is not None:
+            archivo_path = str(full_path)
 
     # Armamos el metadata que se guarda en la columna JSON `metadata`
     metadata = {
@@ -104,21 +305,28 @@ async def contact_upload(
         "iniciativa": iniciativa,
         "archivo_nombre": archivo_nombre,
         "archivo_path": archivo_path,
+        "archivo_tipo": archivo_tipo,
     }
 
-    # Reutilizamos el endpoint de analytics
+    # Mismo formato que /track
     event = TrackEvent(
         event_name="contact_form_submitted",
         page=request.headers.get("referer") or "/",
         metadata=metadata,
     )
 
-    # Esto guarda el evento en la tabla `events`
-    return await track(event, request)
+    # Se guarda en la tabla `events` en el momento (sin la cola de /track)
+    await _save_event(db, _event_row(event, request))
+    return {"status": "ok"}
+
+# Con UploadLimitRoute, para limitar el body antes de que se parsee
+router.add_api_route(
+    "/contact-upload", contact_upload, methods=["POST"], route_class_override=UploadLimitRoute
+)
 
 
 @router.post("/contact")
-async def contact(form: ContactForm, request: Request):
+async def contact(form: ContactForm, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Recibe los datos del formulario de contacto y los guarda
     como un evento en la tabla 'events'.
@@ -130,5 +338,6 @@ async def contact(form: ContactForm, request: Request):
         metadata=form.dict(),
     )
 
-    # Reutilizamos el endpoint de tracking existente
-    return await track(event, request)
+    # Se guarda en el momento (sin la cola de /track)
+    await _save_event(db, _event_row(event, request))
+    return {"status": "ok"}
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+
+from .. import metrics
+from ..deps import require_bearer_token
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    include_in_schema=False,
+    dependencies=[Depends(require_bearer_token("METRICS_TOKEN"))],
+)
+def prometheus_metrics():
+    """Prometheus text format, summed over every worker (see app/metrics.py).
+
+    Sync on purpose: in multiprocess mode this reads one file per worker.
+    """
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
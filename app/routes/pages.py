@@ -1,33 +1,28 @@
-import json
-import os
-from typing import List, Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from fastapi import APIRouter, Request, HTTPException
+from ..config import settings
 from ..deps import common_context, render_variant_template
+from ..initiatives import initiatives as initiatives_repo
 
 router = APIRouter()
 
-def load_initiatives() -> List[Dict[str, Any]]:
-    """Temporary in-memory initiatives so the templates have something to render.
-    Replace this entirely with your real data access layer.
-    """
-    filepath = os.path.dirname(os.path.abspath(__file__)) + '/cards.json'
-    with open(filepath, "r") as read_file:
-        data = json.load(read_file)
-    return data
-    
-
-def _get_initiative_by_id(initiative_id: int) -> Optional[Dict[str, Any]]:
-    for initiative in load_initiatives():
-        if initiative["id"] == initiative_id:
-            return initiative
-    return None
+def _get_initiative_by_id(initiative_id: int) -> Tuple[Optional[Dict[str, Any]], int]:
+    """(initiative or None, version of the cards.json it was read from)."""
+    return initiatives_repo.get_with_version(initiative_id)
 
 @router.get("/", name="home")
 def home(request: Request):
-    initiatives = load_initiatives()
+    """First page of initiatives; front-end.js fetches the rest from /api/initiatives."""
+    first_page = initiatives_repo.search(limit=settings.INITIATIVES_PAGE_SIZE)
     ctx = common_context(request, title="Iniciativas")
-    ctx.update({"initiatives": initiatives,})
-    return render_variant_template(request, "home.html", ctx)
+    ctx.update({
+        "initiatives": first_page.items,
+        "initiatives_total": first_page.total,
+        "page_size": settings.INITIATIVES_PAGE_SIZE,
+    })
+    return render_variant_template(
+        request, "home.html", ctx, cache_version=first_page.version
+    )
 
 @router.get("/about", name="about")
 def about(request: Request):
@@ -37,7 +32,7 @@ def about(request: Request):
 @router.get("/initiatives/{initiative_id}", name="initiative_detail")
 def initiative_detail(request: Request, initiative_id: int):
     """Detail page for a single initiative."""
-    initiative = _get_initiative_by_id(initiative_id)
+    initiative, version = _get_initiative_by_id(initiative_id)
     if initiative is None:
         raise HTTPException(status_code=404, detail="Iniciativa no encontrada")
 
@@ -47,4 +42,6 @@ def initiative_detail(request: Request, initiative_id: int):
     )
     ctx.update({"initiative": initiative})
 
-    return render_variant_template(request, "initiative_detail.html", ctx)
+    return render_variant_template(
+        request, "initiative_detail.html", ctx, cache_version=version
+    )
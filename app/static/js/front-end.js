@@ -72,59 +72,92 @@ function initModalSystem() {
   });
 }
 
-// Search engine
+// Search engine: results come from /api/initiatives (see app/initiatives.py).
+// The page ships the first page of cards; filters and "Ver más" fetch the rest.
+const SEARCH_DEBOUNCE_MS = 200;
+
 function initFiltering() {
   const searchInput = document.querySelector("[data-filter-search]");
   const categorySelect = document.querySelector("[data-filter-category]");
   const statusSelect = document.querySelector("[data-filter-status]");
-  const resetButtons = document.querySelectorAll("[data-filter-reset]");
-  const cards = document.querySelectorAll("[data-initiative-card]");
-
-  if (!cards.length) return;
-
-  function normalize(text) {
-    return (text || "").toString().toLowerCase().normalize("NFD").replace(/\p{Diacritic}/gu, "");
+  const grid = document.querySelector("[data-initiatives-grid]");
+  const moreButton = document.querySelector("[data-initiatives-more]");
+
+  if (!grid) return;
+
+  const pageSize = Number(grid.getAttribute("data-page-size")) || 12;
+  let nextOffset = grid.hasAttribute("data-next-offset")
+    ? Number(grid.getAttribute("data-next-offset"))
+    : null;
+  let latestRequest = 0; // responses to older requests are ignored
+  let debounceTimer = null;
+
+  // Show how many results each status would give, e.g. "Nuevo Proyecto (3)"
+  function updateStatusCounts(facets) {
+    if (!statusSelect) return;
+    const counts = Object.fromEntries(facets.map((f) => [f.value, f.count]));
+    Array.from(statusSelect.options).forEach((option) => {
+      if (!option.value) return;
+      if (!option.dataset.label) option.dataset.label = option.textContent.trim();
+      option.textContent = `${option.dataset.label} (${counts[option.value] || 0})`;
+    });
   }
 
-  function applyFilters() {
-    const term = normalize(searchInput ? searchInput.value : "");
+  async function load(offset) {
+    const params = new URLSearchParams({ offset, limit: pageSize, html: "true" });
+    const term = searchInput ? searchInput.value.trim() : "";
     const status = statusSelect ? statusSelect.value : "";
+    if (term) params.set("q", term);
+    if (status) params.set("status", status);
 
-    cards.forEach((card) => {
-      const title = normalize(card.getAttribute("data-initiative-title"));
-      const cardStatus = card.getAttribute("data-initiative-status") || "";
-
-      let matches = true;
-
-      if (term && !title.includes(term)) {
-        matches = false;
-      }
-
-      if (status && cardStatus !== status) {
-        matches = false;
-      }
+    const requestId = ++latestRequest;
+    let data;
+    try {
+      const response = await fetch(`/api/initiatives?${params}`);
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      data = await response.json();
+    } catch (err) {
+      console.error("Error buscando iniciativas:", err);
+      return;
+    }
+    if (requestId !== latestRequest) return;
+
+    const cards = document.createElement("template");
+    cards.innerHTML = data.html;
+    if (typeof bindTracking === "function") bindTracking(cards.content);
+    if (offset === 0) {
+      grid.replaceChildren(cards.content);
+    } else {
+      grid.append(cards.content);
+    }
 
-      if (matches) {
-        card.classList.remove("hidden");
-      } else {
-        card.classList.add("hidden");
-      }
-    });
+    nextOffset = data.next_offset;
+    if (moreButton) moreButton.classList.toggle("hidden", nextOffset === null);
+    updateStatusCounts(data.facets.status);
   }
 
   if (searchInput) {
-    searchInput.addEventListener("input", applyFilters);
+    searchInput.addEventListener("input", () => {
+      clearTimeout(debounceTimer);
+      debounceTimer = setTimeout(() => load(0), SEARCH_DEBOUNCE_MS);
+    });
   }
   if (statusSelect) {
-    statusSelect.addEventListener("change", applyFilters);
+    statusSelect.addEventListener("change", () => load(0));
   }
-  resetButtons.forEach((btn) => {
-    btn.addEventListener("click", () => {
-      if (searchInput) searchInput.value = "";
-      if (categorySelect) categorySelect.value = "";
-      if (statusSelect) statusSelect.value = "";
-      applyFilters();
+  if (moreButton) {
+    moreButton.addEventListener("click", () => {
+      if (nextOffset !== null) load(nextOffset);
     });
+  }
+  // Delegated: the empty state's reset button comes with the results
+  document.addEventListener("click", (event) => {
+    if (!event.target.closest("[data-filter-reset]")) return;
+    if (searchInput) searchInput.value = "";
+    if (categorySelect) categorySelect.value = "";
+    if (statusSelect) statusSelect.value = "";
+    clearTimeout(debounceTimer);
+    load(0);
   });
 }
 
@@ -161,6 +194,12 @@ function initContactForm() {
         body: formData,
       });
 
+      if (response.status === 413 || response.status === 415) {
+        // Archivo demasiado grande o que no es un CV: el servidor dice por qué
+        const data = await response.json().catch(() => ({}));
+        alert(data.detail || "No pudimos aceptar el archivo adjunto.");
+        return;
+      }
       if (!response.ok) {
         throw new Error("Error al enviar el formulario");
       }
@@ -1,40 +1,106 @@
 // Generic first-party analytics tracking.
-// Attaches click listeners to any element with a `data-event-name` attribute
-// and sends a lightweight POST to /api/track without blocking navigation.
+// Attaches click listeners to any element with a `data-event-name` attribute.
+// Events are buffered and sent in bulk to /api/track/batch:
+//   - as soon as MAX_BATCH events are waiting,
+//   - every FLUSH_INTERVAL_MS,
+//   - and when the page is hidden or unloaded (visibilitychange / pagehide),
+//     together with any text-input event still waiting out its debounce,
+// always without blocking navigation.
 
-document.addEventListener("DOMContentLoaded", function () {
-  
-  // Click tracker
-  const trackable = document.querySelectorAll("[data-event-name]");
+const TRACK_BATCH_URL = "/api/track/batch";
+const MAX_BATCH = 20;
+const FLUSH_INTERVAL_MS = 5000;
+// Text inputs fire on every click/keystroke; only the last one in a burst is kept
+const INPUT_DEBOUNCE_MS = 800;
+
+const trackQueue = [];
+// Debounced text-input events not queued yet: element -> { timer, eventName }
+const pendingInputs = new Map();
+
+function flushEvents() {
+  if (!trackQueue.length) return;
+
+  const events = trackQueue.splice(0, trackQueue.length);
+  try {
+    const body = JSON.stringify({ events });
+
+    // sendBeacon returns false if the browser refuses to queue it
+    if (navigator.sendBeacon) {
+      const blob = new Blob([body], { type: "application/json" });
+      if (navigator.sendBeacon(TRACK_BATCH_URL, blob)) return;
+    }
+    fetch(TRACK_BATCH_URL, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body,
+      keepalive: true,
+    }).catch(() => {});
+  } catch (err) {
+    console.error("Tracking error:", err);
+  }
+}
+
+function trackEvent(eventName) {
+  trackQueue.push({
+    event_name: eventName,       // Saves the string of the 'data-event-name' attribute
+    page: window.location.pathname,
+    variant: window.APP_VARIANT || null,
+    metadata: {}                 // optional — If you add other attributes to the button, those will be saved here
+  });
+  if (trackQueue.length >= MAX_BATCH) flushEvents();
+}
+
+// Queues the debounced events right away (the last search typed is often
+// the last thing the user did before leaving)
+function queuePendingInputs() {
+  pendingInputs.forEach(({ timer, eventName }) => {
+    clearTimeout(timer);
+    trackEvent(eventName);
+  });
+  pendingInputs.clear();
+}
+
+function flushOnLeave() {
+  queuePendingInputs();
+  flushEvents();
+}
+
+function isTextInput(el) {
+  if (el.tagName === "TEXTAREA") return true;
+  return el.tagName === "INPUT" && ["text", "search", "email", ""].includes(el.type || "");
+}
+
+// Click tracker for the elements under `root`. Also called by front-end.js
+// on the cards it loads from /api/initiatives.
+function bindTracking(root) {
+  const trackable = root.querySelectorAll("[data-event-name]");
   trackable.forEach((el) => {
     el.addEventListener("click", () => {
       const eventName = el.dataset.eventName;
       if (!eventName) return;
 
-      const payload = {
-        event_name: eventName,       // Saves the string of the 'data-event-name' attribute
-        page: window.location.pathname,
-        variant: window.APP_VARIANT || null,
-        metadata: {}                 // optional — If you add other attributes to the button, those will be saved here
-      };
-
-      try {
-        const body = JSON.stringify(payload);
-
-        if (navigator.sendBeacon) {
-          const blob = new Blob([body], { type: "application/json" });
-          navigator.sendBeacon("/api/track", blob);
-        } else {
-          fetch("/api/track", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body,
-            keepalive: true,
-          }).catch(() => {});
-        }
-      } catch (err) {
-        console.error("Tracking error:", err);
+      if (isTextInput(el)) {
+        const pending = pendingInputs.get(el);
+        if (pending) clearTimeout(pending.timer);
+        const timer = setTimeout(() => {
+          pendingInputs.delete(el);
+          trackEvent(eventName);
+        }, INPUT_DEBOUNCE_MS);
+        pendingInputs.set(el, { timer, eventName });
+        return;
       }
+      trackEvent(eventName);
     });
   });
+}
+
+document.addEventListener("DOMContentLoaded", function () {
+  bindTracking(document);
+  setInterval(flushEvents, FLUSH_INTERVAL_MS);
+});
+
+// Last chance to send what is buffered before the page goes away
+document.addEventListener("visibilitychange", () => {
+  if (document.visibilityState === "hidden") flushOnLeave();
 });
+window.addEventListener("pagehide", flushOnLeave);
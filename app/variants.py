@@ -1,4 +1,10 @@
 # app/variants.py
+import bisect
+import hashlib
+import itertools
+import random
+import threading
+import time
 from pathlib import Path
 
 TEMPLATES_DIR = Path("app/templates")
@@ -11,4 +17,117 @@ def get_available_variants() -> list[str]:
     return sorted(
         d.name for d in VARIANTS_DIR.iterdir()
         if d.is_dir() and not d.name.startswith("_")
-    )
\ No newline at end of file
+    )
+
+class VariantAssigner:
+    """Chooses the A/B variant of a new visitor, honouring traffic weights.
+
+    - mode="hash": a salted hash of the session id is mapped onto the
+      cumulative weights. Pure CPU, the same answer on every worker, and
+      reproducible offline from the session ids alone.
+    - mode="random": an independent weighted random draw.
+    """
+
+    def __init__(
+        self,
+        variants: list[str],
+        weights: dict[str, float] | None = None,
+        mode: str = "hash",
+        salt: str = "",
+    ):
+        weights = weights or {}
+        self.variants = list(variants)
+        self.weights = [float(weights.get(v, 1.0)) for v in self.variants]
+        total = sum(self.weights)
+        if not self.variants or total <= 0:
+            raise ValueError(f"No variant has a positive weight: {weights}")
+        self.cumulative = list(itertools.accumulate(w / total for w in self.weights))
+        self.mode = mode
+        self.salt = salt
+
+    def bucket(self, session_id: str) -> float:
+        """Deterministic point in [0, 1) for a session."""
+        digest = hashlib.blake2b(
+            f"{self.salt}:{session_id}".encode("utf-8"), digest_size=8
+        ).digest()
+        return int.from_bytes(digest, "big") / 2**64
+
+    def assign(self, session_id: str) -> str:
+        if self.mode == "random":
+            return random.choices(self.variants, weights=self.weights)[0]
+        index = bisect.bisect_right(self.cumulative, self.bucket(session_id))
+        # guard against float rounding in the last cumulative weight
+        return self.variants[min(index, len(self.variants) - 1)]
+
+
+def build_template_map(variants: list[str]) -> dict[str, dict[str, str]]:
+    """{variant -> {logical template -> concrete template path}}.
+
+    Only templates that a variant actually overrides are listed; anything
+    missing resolves to the default template of the same name.
+    """
+    table: dict[str, dict[str, str]] = {}
+    for variant in variants:
+        variant_dir = VARIANTS_DIR / variant
+        overrides: dict[str, str] = {}
+        if variant_dir.is_dir():
+            for path in variant_dir.rglob("*.html"):
+                logical = path.relative_to(variant_dir).as_posix()
+                overrides[logical] = f"variants/{variant}/{logical}"
+        table[variant] = overrides
+    return table
+
+
+def _variants_signature() -> tuple:
+    """mtimes of every directory under variants/ (changes when files are added/removed)."""
+    if not VARIANTS_DIR.exists():
+        return ()
+    dirs = [VARIANTS_DIR, *(p for p in VARIANTS_DIR.rglob("*") if p.is_dir())]
+    return tuple(sorted((str(d), d.stat().st_mtime) for d in dirs))
+
+
+class VariantTemplateResolver:
+    """Resolves variant template overrides with a dict lookup.
+
+    The table is built from a scan of app/templates/variants/ and rebuilt
+    when a directory under it changes; that check runs at most once every
+    `check_interval` seconds. `generation` counts the rebuilds, so caches
+    of rendered HTML can tell when an override was added or removed.
+    """
+
+    def __init__(self, check_interval: float = 2.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._table: dict[str, dict[str, str]] | None = None
+        self._signature: tuple | None = None
+        self._next_check = 0.0
+        self._generation = 0
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._signature = _variants_signature()
+            self._table = build_template_map(get_available_variants())
+            self._generation += 1
+            self._next_check = time.monotonic() + self.check_interval
+
+    def table(self) -> dict[str, dict[str, str]]:
+        if self._table is None or time.monotonic() >= self._next_check:
+            if self._table is None or _variants_signature() != self._signature:
+                self.refresh()
+            else:
+                self._next_check = time.monotonic() + self.check_interval
+        return self._table
+
+    @property
+    def generation(self) -> int:
+        """Bumped every time the table is rebuilt."""
+        self.table()
+        return self._generation
+
+    def resolve(self, template_name: str, variant: str | None) -> str:
+        if not variant:
+            return template_name
+        return self.table().get(variant, {}).get(template_name, template_name)
+
+
+template_resolver = VariantTemplateResolver()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Latency and query plans of every analytics_cli.py command, before and after
+the composite indexes of migration 0002.
+
+Seeds a throwaway SQLite DB with synthetic events/page_views, migrates it to
+0001 (single-column indexes only), times each command and prints its
+`EXPLAIN QUERY PLAN`, then upgrades to 0002 and does it again.
+
+Usage:
+
+    python benchmarks/bench_analytics.py                 # 1M events + 1M page views
+    python benchmarks/bench_analytics.py --rows 5000000 --no-plans
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VARIANTS = ["a", "b", "c"]
+PAGES = ["/", "/about"] + [f"/initiatives/{i}" for i in range(1, 13)]
+EVENT_NAMES = [
+    f"{action}_{target}_{location}"
+    for action in ("click", "change", "input")
+    for target in ("buy-now", "contact", "status", "search", "card")
+    for location in ("hero", "navbar", "filter-bar", "grid")
+]
+
+
+def seed(db_path: str, rows: int, batch: int = 50_000) -> None:
+    rnd = random.Random(42)
+    sessions = max(rows // 10, 1)
+    start = datetime(2025, 1, 1)
+    span = 90 * 24 * 3600
+
+    def ts():
+        return (start + timedelta(seconds=rnd.randrange(span))).strftime("%Y-%m-%d %H:%M:%S")
+
+    def events():
+        for _ in range(rows):
+            name = "contact_form_submitted" if rnd.random() < 0.01 else rnd.choice(EVENT_NAMES)
+            yield (
+                str(rnd.randrange(sessions)), name, rnd.choice(PAGES),
+                rnd.choice(VARIANTS), "{}", ts(),
+            )
+
+    def page_views():
+        for _ in range(rows):
+            yield (str(rnd.randrange(sessions)), rnd.choice(PAGES), rnd.choice(VARIANTS), ts())
+
+    conn = sqlite3.connect(db_path)
+    for sql, gen in (
+        (
+            "INSERT INTO events (session_id, event_name, page_url, variant_name, metadata, timestamp)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            events(),
+        ),
+        (
+            "INSERT INTO page_views (session_id, page, variant_name, timestamp) VALUES (?, ?, ?, ?)",
+            page_views(),
+        ),
+    ):
+        while True:
+            chunk = [row for _, row in zip(range(batch), gen)]
+            if not chunk:
+                break
+            conn.executemany(sql, chunk)
+            conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def commands(cli):
+    """(label, callable(conn)) for every read command of the CLI."""
+    return [
+        ("summary", lambda c: cli.summary(c)),
+        ("events", lambda c: cli.events_by_variant(c, "click_buy-now_hero")),
+        ("events-detailed", lambda c: cli.events_detailed_by_variant(c, "click_buy-now_hero")),
+        ("events-like", lambda c: cli.events_like(c, "click_buy-now_%")),
+        ("pageviews", lambda c: cli.pageviews_by_variant(c, "/")),
+        ("conversion", lambda c: cli.conversion_by_variant(c, "click_buy-now_hero", "/")),
+        ("recent", lambda c: cli.recent_events(c, 20)),
+        ("contact-forms", lambda c: cli.contact_forms(c, 50)),
+    ]
+
+
+def run_commands(cli, db_path: str, repeat: int, show_plans: bool) -> dict:
+    conn = cli.get_connection(db_path)
+    results = {}
+    for label, fn in commands(cli):
+        statements = []
+        conn.set_trace_callback(statements.append)
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn(conn)  # warm-up + capture the SQL
+        conn.set_trace_callback(None)
+
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn(conn)
+            timings.append(time.perf_counter() - t0)
+        results[label] = min(timings)
+
+        if show_plans:
+            print(f"\n[{label}] {results[label] * 1000:.1f} ms")
+            for sql in statements:
+                for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+                    print(f"    {row['detail']}")
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analytics_cli.py queries")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows per table")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per command (best is kept)")
+    parser.add_argument("--no-plans", action="store_true", help="Skip EXPLAIN QUERY PLAN output")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="rf-bench-")
+    db_path = os.path.join(tmpdir, "analytics.db")
+    os.environ["DB_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("FASTAPI_NAME", "bench")
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+
+    from alembic import command
+    from alembic.config import Config
+
+    import analytics_cli as cli
+
+    alembic_cfg = Config(os.path.join(ROOT, "alembic.ini"))
+
+    command.upgrade(alembic_cfg, "0001")
+    t0 = time.perf_counter()
+    seed(db_path, args.rows)
+    print(f"Seeded {args.rows:,} events + {args.rows:,} page views in {time.perf_counter() - t0:.1f}s")
+
+    print("\n=== 0001: single-column indexes ===")
+    before = run_commands(cli, db_path, args.repeat, not args.no_plans)
+
+    t0 = time.perf_counter()
+    command.upgrade(alembic_cfg, "0002")
+    print(f"\nMigration 0002 took {time.perf_counter() - t0:.1f}s")
+
+    print("\n=== 0002: composite indexes ===")
+    after = run_commands(cli, db_path, args.repeat, not args.no_plans)
+
+    print(f"\n{'Command':<18} {'0001 (ms)':>12} {'0002 (ms)':>12} {'Speed-up':>10}")
+    print("-" * 56)
+    for label in before:
+        b, a = before[label] * 1000, after[label] * 1000
+        print(f"{label:<18} {b:>12.1f} {a:>12.1f} {b / a if a else 0:>9.1f}x")
+    print(f"\n(DB left at {db_path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Exact COUNT(DISTINCT session_id) vs the HyperLogLog sketches in
+`rollup_event_hll`: latency and relative error.
+
+Seeds a throwaway SQLite DB (migrated to head), runs `rollup` once, then
+answers the same unique-session questions both ways:
+
+- every (variant, event) pair over all time (what `summary --approx-unique` shows)
+- one event over a 30-day range (merging 30 daily sketches per variant)
+
+Usage:
+
+    python benchmarks/bench_hll.py
+    python benchmarks/bench_hll.py --rows 5000000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+EVENT = "click_buy-now_hero"
+SINCE, UNTIL = "2025-02-01", "2025-03-02"
+
+
+def exact_all(conn):
+    rows = conn.execute(
+        """
+        SELECT variant_name, event_name, COUNT(DISTINCT session_id)
+        FROM events
+        GROUP BY variant_name, event_name
+        """
+    )
+    return {(v, e): n for v, e, n in rows}
+
+
+def exact_range(conn):
+    rows = conn.execute(
+        """
+        SELECT variant_name, event_name, COUNT(DISTINCT session_id)
+        FROM events
+        WHERE event_name = ? AND date(timestamp) BETWEEN ? AND ?
+        GROUP BY variant_name
+        """,
+        (EVENT, SINCE, UNTIL),
+    )
+    return {(v, e): n for v, e, n in rows}
+
+
+def timed(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HLL unique-session estimates")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows per table")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query (best is kept)")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="rf-bench-")
+    db_path = os.path.join(tmpdir, "analytics.db")
+    os.environ["DB_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("FASTAPI_NAME", "bench")
+    os.chdir(ROOT)
+
+    from alembic import command
+    from alembic.config import Config
+
+    import analytics_cli as cli
+    import analytics_hll as hll
+    from bench_analytics import seed
+
+    command.upgrade(Config(os.path.join(ROOT, "alembic.ini")), "head")
+    seed(db_path, args.rows)
+
+    conn = cli.get_connection(db_path, readonly=False)
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        cli.rollup(conn)
+    print(f"Seeded {args.rows:,} events; rollup (incl. sketches) took {time.perf_counter() - t0:.1f}s")
+    conn.close()
+
+    conn = cli.get_connection(db_path)
+    cases = [
+        ("all (variant, event)", lambda: exact_all(conn), lambda: cli.approx_unique_sessions(conn)),
+        (
+            f"{EVENT}, 30 days",
+            lambda: exact_range(conn),
+            lambda: cli.approx_unique_sessions(
+                conn, EVENT, cli.parse_time(SINCE), cli.parse_time(UNTIL, end=True)
+            ),
+        ),
+    ]
+
+    print(f"\n{'Query':<32} {'Exact ms':>10} {'HLL ms':>10} {'Groups':>8} {'Mean err':>10} {'Max err':>10}")
+    print("-" * 86)
+    for label, exact_fn, approx_fn in cases:
+        exact_t, exact = timed(exact_fn, args.repeat)
+        approx_t, approx = timed(approx_fn, args.repeat)
+        errors = [abs(approx.get(key, 0) - n) / n for key, n in exact.items() if n]
+        mean_err = sum(errors) / len(errors) if errors else 0.0
+        max_err = max(errors, default=0.0)
+        print(
+            f"{label:<32} {exact_t * 1000:>10.1f} {approx_t * 1000:>10.1f} "
+            f"{len(exact):>8} {mean_err:>10.2%} {max_err:>10.2%}"
+        )
+    conn.close()
+    print(f"\nExpected error: ±{hll.STANDARD_ERROR:.1%} (1 sd), ±{2 * hll.STANDARD_ERROR:.1%} (95%)")
+    print(f"(DB left at {db_path})")
+
+
+if __name__ == "__main__":
+    main()
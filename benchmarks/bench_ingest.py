@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Concurrent write throughput of ONE uvicorn worker.
+
+Starts `uvicorn app.main:app --workers 1` on a throwaway SQLite DB, fires
+`--requests` POSTs per endpoint at `--concurrency` levels over real HTTP,
+and reports requests/sec and latency percentiles. Every row is then counted
+in the DB after a graceful shutdown (which drains the write-behind queues).
+
+Usage:
+
+    python benchmarks/bench_ingest.py
+    python benchmarks/bench_ingest.py --requests 5000 --levels 10 50 200
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ENDPOINTS = {
+    "/api/track": lambda i: {"event_name": "click_buy-now_hero", "page": "/", "metadata": {"i": i}},
+    "/api/track/batch": lambda i: {
+        "events": [{"event_name": "click_card_grid", "page": "/", "metadata": {"i": i}}] * 20
+    },
+    "/api/contact": lambda i: {
+        "nombre": "Ada", "apellido": "Lovelace", "email": f"ada{i}@example.com",
+        "carrera": "Ingeniería", "iniciativa": "1",
+    },
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(client, url: str, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get(url + "/static/js/tracking.js")
+            return
+        except Exception:
+            await asyncio.sleep(0.1)
+    raise SystemExit("[ERROR] uvicorn did not start")
+
+
+async def load(client, url: str, path: str, total: int, concurrency: int) -> tuple:
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    make_body = ENDPOINTS[path]
+
+    async def one(i):
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.post(url + path, json=make_body(i))
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    return total / elapsed, pct(0.5), pct(0.99)
+
+
+async def main(args, url: str) -> None:
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(args.levels))
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await wait_ready(client, url)
+        print(f"{'Endpoint':<18} {'Concurrent':>10} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+        print("-" * 62)
+        for path in ENDPOINTS:
+            for level in args.levels:
+                rps, p50, p99 = await load(client, url, path, args.requests, level)
+                print(f"{path:<18} {level:>10} {rps:>10.0f} {p50:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark write endpoints on one uvicorn worker")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint and level")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="rf-bench-")
+    db_path = os.path.join(tmpdir, "bench.db")
+    env = dict(os.environ, DB_URL=f"sqlite:///{db_path}", FASTAPI_NAME="bench")
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", "1", "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        asyncio.run(main(args, f"http://127.0.0.1:{port}"))
+    finally:
+        server.terminate()  # graceful: the shutdown hook drains the queues
+        server.wait(timeout=60)
+
+    import analytics_queries as queries
+
+    conn = queries.connect(db_path)  # events land in monthly partitions
+    events = conn.execute(f"SELECT COUNT(*) FROM {queries.source(conn, 'events')}").fetchone()[0]
+    conn.close()
+    per_level = args.requests * len(args.levels)
+    expected = per_level * (1 + 20 + 1)
+    print(f"\nRows in events after shutdown: {events:,} (expected {expected:,})")
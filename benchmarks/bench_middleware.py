@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Requests/sec through SessionVariantMiddleware for an HTML page, a static file
+and a /api/track beacon, plus the Set-Cookie bytes sent back with each.
+
+The app runs in-process (httpx ASGI transport, no network) against a
+throwaway SQLite DB, so the numbers mostly reflect middleware + handler cost.
+The last table times the middleware alone, around an app that does nothing.
+
+Usage:
+
+    python benchmarks/bench_middleware.py
+    python benchmarks/bench_middleware.py --requests 2000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import http.cookiejar
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_env() -> str:
+    tmpdir = tempfile.mkdtemp(prefix="rf-bench-")
+    os.environ["DB_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ.setdefault("FASTAPI_NAME", "bench")
+    # The app uses paths relative to the repo root (templates, static, uploads)
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    return tmpdir
+
+
+TRACK_EVENT = {"event_name": "click_buy-now_hero", "page": "/", "metadata": {}}
+
+
+def set_cookie_bytes(response) -> int:
+    return sum(len(v) for k, v in response.headers.multi_items() if k == "set-cookie")
+
+
+async def run_path(
+    client, method: str, path: str, total: int, concurrency: int, returning: bool
+) -> tuple[float, float]:
+    """Returns (req/s, mean Set-Cookie bytes per response)."""
+    headers = {}
+    if returning:
+        # Grab cookies once so every request looks like a returning visitor
+        first = await client.get("/")
+        headers["cookie"] = "; ".join(f"{k}={v}" for k, v in first.cookies.items())
+    body = {"json": TRACK_EVENT} if method == "POST" else {}
+
+    sem = asyncio.Semaphore(concurrency)
+    cookie_bytes = 0
+
+    async def one():
+        nonlocal cookie_bytes
+        async with sem:
+            r = await client.request(method, path, headers=headers, **body)
+            r.raise_for_status()
+            cookie_bytes += set_cookie_bytes(r)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - start), cookie_bytes / total
+
+
+async def middleware_only(cookie: str, path: str, method: str, total: int) -> float:
+    """Microseconds per request spent in SessionVariantMiddleware alone."""
+    from app.main import SessionVariantMiddleware
+
+    async def noop_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    middleware = SessionVariantMiddleware(noop_app)
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    start = time.perf_counter()
+    for _ in range(total):
+        scope = {"type": "http", "method": method, "path": path, "headers": headers}
+        await middleware(scope, receive, send)
+    return (time.perf_counter() - start) / total * 1e6
+
+
+async def main(args):
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    # Never store cookies on the client: "new" visitors must stay new
+    no_cookies = http.cookiejar.CookieJar(
+        policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+    )
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", cookies=no_cookies
+        ) as client:
+            print(f"{'Request':<32} {'Visitor':<10} {'req/s':>10} {'Set-Cookie B':>13}")
+            print("-" * 68)
+            for method, path in (
+                ("GET", "/"), ("GET", "/static/js/tracking.js"), ("POST", "/api/track")
+            ):
+                for returning in (False, True):
+                    rps, cookie_bytes = await run_path(
+                        client, method, path, args.requests, args.concurrency, returning
+                    )
+                    kind = "returning" if returning else "new"
+                    print(f"{method + ' ' + path:<32} {kind:<10} {rps:>10.1f} {cookie_bytes:>13.0f}")
+
+            first = await client.get("/")
+            cookie = "; ".join(f"{k}={v}" for k, v in first.cookies.items())
+
+        print()
+        print(f"{'Middleware only':<32} {'Visitor':<10} {'us/req':>10}")
+        print("-" * 54)
+        for method, path in (("GET", "/"), ("POST", "/api/track")):
+            for kind, header in (("new", ""), ("returning", cookie)):
+                # Fewer rows than TRACK_QUEUE_MAXSIZE, so none are dropped
+                us = await middleware_only(header, path, method, 2_000)
+                print(f"{method + ' ' + path:<32} {kind:<10} {us:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the A/B middleware")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_env()
+    asyncio.run(main(args))
@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+"""
+Replays a realistic traffic mix against the whole app on a throwaway SQLite
+DB and reports, per kind of request, p50/p95/p99 latency and errors, plus
+overall requests/sec and rows/sec written to the DB.
+
+The mix (MIX below) covers new visitors landing on a page, returning
+visitors browsing, single /api/track events, /api/track/batch bursts,
+contact forms and CV uploads. Requests are drawn from a seeded RNG, so the
+same arguments replay the same traffic.
+
+Two drivers:
+
+- in-process (default): httpx ASGI transport, no network or server, so the
+  numbers mostly reflect the app's own cost (middleware, handlers, ingest).
+- --server: starts gunicorn with --workers uvicorn workers, like the
+  Dockerfile, and drives it over HTTP from --procs load generator processes.
+
+Rows are counted after a graceful shutdown, which drains the write-behind
+queues, so rows/sec covers everything written during the run.
+
+The same traffic is replayed --repeat times; percentiles are taken over
+all of them and req/s is the median, which keeps run-to-run noise down.
+
+--save-baseline stores the results as JSON; --baseline compares a run with
+one and exits with status 1 if req/s dropped, or a scenario's p50 or the
+overall p95 grew, by more than --tolerance. Numbers are machine-specific:
+benchmarks/baseline_traffic.json is a reference run of the defaults; to
+check a change, record a baseline on the same machine before making it.
+
+Usage:
+
+    python benchmarks/bench_traffic.py
+    python benchmarks/bench_traffic.py --save-baseline /tmp/before.json
+    python benchmarks/bench_traffic.py --baseline /tmp/before.json
+    python benchmarks/bench_traffic.py --server --workers 4 --procs 4 --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Relative weights of each kind of request
+MIX = {
+    "page, new visitor": 15,
+    "page, returning": 45,
+    "track": 25,
+    "track burst": 8,
+    "contact": 5,
+    "upload": 2,
+}
+BURST_SIZE = 20  # events per /api/track/batch (tracking.js flushes every 20)
+UPLOAD_KB = 200
+CONTACT = {
+    "nombre": "Ada", "apellido": "Lovelace", "email": "ada@example.com",
+    "carrera": "Ingeniería", "iniciativa": "1",
+}
+TABLES = ("events", "page_views", "ab_assignments")
+
+
+class Traffic:
+    """Seeded generator of (scenario, method, path, httpx kwargs)."""
+
+    def __init__(self, seed: int, pages: list, variants: list):
+        self.rng = random.Random(seed)
+        self.pages = pages
+        self.variants = variants
+        self.scenarios = list(MIX)
+        self.weights = list(MIX.values())
+        # A PDF header so content sniffing accepts it; the rest is filler
+        self.upload = b"%PDF-1.4\n" + self.rng.randbytes(UPLOAD_KB * 1024)
+
+    def _returning(self) -> dict:
+        # The middleware trusts existing cookies: any session id will do
+        cookie = f"session_id={uuid.UUID(int=self.rng.getrandbits(128))}; ab_variant={self.rng.choice(self.variants)}"
+        return {"cookie": cookie}
+
+    def _event(self) -> dict:
+        return {
+            "event_name": self.rng.choice(["click_buy-now_hero", "click_card_grid", "click_contact_navbar"]),
+            "page": self.rng.choice(self.pages),
+        }
+
+    def next(self) -> tuple:
+        scenario = self.rng.choices(self.scenarios, self.weights)[0]
+        if scenario == "page, new visitor":
+            return scenario, "GET", self.rng.choice(self.pages), {}
+        headers = self._returning()
+        if scenario == "page, returning":
+            return scenario, "GET", self.rng.choice(self.pages), {"headers": headers}
+        if scenario == "track":
+            return scenario, "POST", "/api/track", {"headers": headers, "json": self._event()}
+        if scenario == "track burst":
+            body = {"events": [self._event() for _ in range(BURST_SIZE)]}
+            return scenario, "POST", "/api/track/batch", {"headers": headers, "json": body}
+        if scenario == "contact":
+            return scenario, "POST", "/api/contact", {"headers": headers, "json": CONTACT}
+        files = {"archivo": ("cv.pdf", self.upload, "application/pdf")}
+        return scenario, "POST", "/api/contact-upload", {"headers": headers, "data": CONTACT, "files": files}
+
+
+def site_pages() -> list:
+    from app.initiatives import initiatives
+
+    return ["/", "/about"] + [f"/initiatives/{item['id']}" for item in initiatives.all()]
+
+
+async def drive(client, traffic: Traffic, total: int, concurrency: int) -> tuple:
+    """Sends `total` requests, `concurrency` at a time.
+
+    Returns (start, end, latencies by scenario, errors by scenario).
+    """
+    requests = [traffic.next() for _ in range(total)]
+    latencies = {name: [] for name in MIX}
+    errors = {name: 0 for name in MIX}
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(scenario, method, path, kwargs):
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, path, **kwargs)
+                failed = r.status_code >= 400
+            except Exception:
+                failed = True
+            latencies[scenario].append(time.perf_counter() - t0)
+            errors[scenario] += failed
+
+    start = time.time()
+    await asyncio.gather(*(one(*request) for request in requests))
+    return start, time.time(), latencies, errors
+
+
+def no_cookies():
+    """A cookie jar that never stores anything: "new" visitors must stay new."""
+    import http.cookiejar
+
+    return http.cookiejar.CookieJar(policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+
+
+def generator(url: str, seed: int, total: int, concurrency: int, pages: list, variants: list) -> tuple:
+    """One load generator process of --server mode."""
+    import httpx
+
+    async def run():
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60, cookies=no_cookies()) as client:
+            return await drive(client, Traffic(seed, pages, variants), total, concurrency)
+
+    return asyncio.run(run())
+
+
+async def run_in_process(args, pages: list, variants: list) -> list:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):  # exiting drains the ingest queues
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies=no_cookies()) as client:
+            repeats = []
+            for _ in range(args.repeat):
+                traffic = Traffic(args.seed, pages, variants)
+                repeats.append([await drive(client, traffic, args.requests, args.concurrency)])
+            return repeats
+
+
+def run_server(args, db_path: str, pages: list, variants: list) -> list:
+    import httpx
+    from bench_ingest import free_port, wait_ready
+
+    from app.db import Base, engine
+    from app import models  # noqa: F401  (registers the tables)
+
+    # Once here rather than racing in every worker's startup
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app.main:app", "-k", "uvicorn.workers.UvicornWorker",
+         "--workers", str(args.workers), "--bind", f"127.0.0.1:{port}", "--log-level", "warning"],
+        # The app imports analytics_queries from the repo root
+        env=dict(os.environ, DB_URL=f"sqlite:///{db_path}", PYTHONPATH=ROOT),
+    )
+    try:
+        async def ready():
+            async with httpx.AsyncClient() as client:
+                await wait_ready(client, url)
+
+        asyncio.run(ready())
+        share = [args.requests // args.procs + (i < args.requests % args.procs) for i in range(args.procs)]
+        per_proc = max(1, args.concurrency // args.procs)
+        with mp.get_context("spawn").Pool(args.procs) as pool:
+            return [
+                pool.starmap(
+                    generator,
+                    [(url, args.seed + i, share[i], per_proc, pages, variants) for i in range(args.procs)],
+                )
+                for _ in range(args.repeat)
+            ]
+    finally:
+        server.terminate()  # graceful: the shutdown hook drains the queues
+        server.wait(timeout=60)
+
+
+def count_rows(db_path: str) -> dict:
+    import analytics_queries as queries
+
+    conn = queries.connect(db_path)
+    try:
+        counts = {}
+        for table in TABLES:
+            source = queries.source(conn, table) if table in queries.TABLE_COLUMNS else table
+            counts[table] = conn.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0]
+        return counts
+    finally:
+        conn.close()
+
+
+def percentile(values: list, p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0.0
+
+
+def summarize(repeats: list, rows: dict, config: dict) -> dict:
+    """Percentiles over the latencies of every repeat (more samples for the
+    rare scenarios); req/s is the median of the repeats."""
+    runs = [run for repeat in repeats for run in repeat]
+    seconds = 0.0
+    rps = []
+    for repeat in repeats:
+        elapsed = max(end for _, end, _, _ in repeat) - min(start for start, _, _, _ in repeat)
+        seconds += elapsed
+        rps.append(sum(len(lat) for _, _, by_name, _ in repeat for lat in by_name.values()) / elapsed)
+
+    scenarios = {}
+    everything = []
+    for name in MIX:
+        latencies = sorted(lat for _, _, by_name, _ in runs for lat in by_name[name])
+        everything.extend(latencies)
+        scenarios[name] = {
+            "requests": len(latencies),
+            "errors": sum(errors[name] for _, _, _, errors in runs),
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+        }
+    everything.sort()
+    scenarios["all"] = {
+        "requests": len(everything),
+        "errors": sum(s["errors"] for s in scenarios.values()),
+        "p50_ms": percentile(everything, 0.50),
+        "p95_ms": percentile(everything, 0.95),
+        "p99_ms": percentile(everything, 0.99),
+    }
+    return {
+        "config": config,
+        "seconds": seconds,
+        "rps": statistics.median(rps),
+        "rows_per_sec": {table: n / seconds for table, n in rows.items()},
+        "scenarios": scenarios,
+    }
+
+
+def report(result: dict) -> None:
+    config = result["config"]
+    print(
+        f"{config['mode']}, {config['repeat']} x {config['requests']} requests, concurrency {config['concurrency']}"
+        + (f", {config['workers']} workers, {config['procs']} load processes" if config["mode"] == "server" else "")
+        + f" (seed {config['seed']})"
+    )
+    print(f"\n{'Scenario':<20} {'Requests':>9} {'Errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("-" * 67)
+    for name, s in result["scenarios"].items():
+        print(
+            f"{name:<20} {s['requests']:>9} {s['errors']:>7} "
+            f"{s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f}"
+        )
+    print(f"\nThroughput: {result['rps']:.0f} req/s ({result['seconds']:.1f}s in total)")
+    print("DB rows/sec: " + ", ".join(f"{t} {n:.0f}" for t, n in result["rows_per_sec"].items()))
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Prints the changes against `baseline`; returns the regressions.
+
+    Checked: req/s, each scenario's p50 and the overall p95. The p95 of a
+    single scenario is shown but not checked: for the rare ones (contact,
+    upload) it is a handful of requests that waited on the SQLite write
+    lock, and moves by 50% between identical runs.
+    """
+    if baseline["config"] != result["config"]:
+        print(f"\n[WARN] baseline was recorded with different arguments: {baseline['config']}")
+
+    def change(now, before):
+        return (now - before) / before if before else 0.0
+
+    print(f"\nAgainst baseline (tolerance {tolerance:.0%}):")
+    print(f"  {'':<20} {'p50 ms, before -> now':>28}   {'p95 ms, before -> now':>28}")
+    regressions = []
+    for name, s in result["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        p50 = change(s["p50_ms"], before["p50_ms"])
+        p95 = change(s["p95_ms"], before["p95_ms"])
+        print(
+            f"  {name:<20} {before['p50_ms']:>9.1f} {s['p50_ms']:>9.1f} {p50:>+8.1%}   "
+            f"{before['p95_ms']:>9.1f} {s['p95_ms']:>9.1f} {p95:>+8.1%}"
+        )
+        if p50 > tolerance:
+            regressions.append(f"p50 {name} {p50:+.1%}")
+        if name == "all" and p95 > tolerance:
+            regressions.append(f"p95 {name} {p95:+.1%}")
+    delta = change(result["rps"], baseline["rps"])
+    print(f"  {'req/s':<20} {baseline['rps']:>9.0f} {result['rps']:>9.0f} {delta:>+8.1%}")
+    if delta < -tolerance:
+        regressions.append(f"req/s {delta:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a traffic mix and report latency and throughput")
+    parser.add_argument("--requests", type=int, default=3000, help="Requests per repeat")
+    parser.add_argument("--repeat", type=int, default=3, help="Replays of the same traffic; the median is reported")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight (over all processes)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server", action="store_true", help="Run gunicorn and load it over HTTP")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers (--server)")
+    parser.add_argument("--procs", type=int, default=2, help="Load generator processes (--server)")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write the results to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare with results saved by --save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed change vs the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.save_baseline:
+        args.save_baseline = os.path.abspath(args.save_baseline)
+
+    tmpdir = tempfile.mkdtemp(prefix="rf-bench-")
+    db_path = os.path.join(tmpdir, "bench.db")
+    os.environ["DB_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("FASTAPI_NAME", "bench")
+    os.environ.setdefault("METRICS_ENABLED", "false")  # measure the app, not the instrumentation
+    # Uploads land in ./data/uploads/cv relative to the working directory
+    os.chdir(tmpdir)
+    os.symlink(os.path.join(ROOT, "app"), os.path.join(tmpdir, "app"))
+
+    from app.variants import get_available_variants
+
+    pages, variants = site_pages(), get_available_variants()
+    config = {
+        "mode": "server" if args.server else "in-process",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "repeat": args.repeat,
+        "seed": args.seed,
+    }
+    if args.server:
+        config.update(workers=args.workers, procs=args.procs)
+        repeats = run_server(args, db_path, pages, variants)
+    else:
+        repeats = asyncio.run(run_in_process(args, pages, variants))
+
+    result = summarize(repeats, count_rows(db_path), config)
+    report(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print("\n[REGRESSION] " + "; ".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
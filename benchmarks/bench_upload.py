@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Peak Python memory while handling concurrent CV uploads on /api/contact-upload.
+
+Sends `--concurrency` simultaneous multipart uploads of `--size-mb` MB each
+through the app in-process and reports the tracemalloc peak, for a few
+concurrency levels. With streamed uploads the peak should stay roughly flat
+instead of growing by one file size per concurrent upload.
+
+Usage:
+
+    python benchmarks/bench_upload.py
+    python benchmarks/bench_upload.py --size-mb 8 --levels 1 4 16
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def run_level(client, payload: bytes, concurrency: int) -> tuple:
+    form = {
+        "nombre": "Ada", "apellido": "Lovelace", "email": "ada@example.com",
+        "carrera": "Ingeniería", "iniciativa": "1",
+    }
+
+    async def one():
+        r = await client.post(
+            "/api/contact-upload",
+            data=form,
+            files={"archivo": ("cv.pdf", payload, "application/pdf")},
+        )
+        r.raise_for_status()
+
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return (peak - base) / 1024 / 1024, elapsed
+
+
+async def main(args):
+    import httpx
+    from app.main import app
+
+    # A PDF header so content sniffing accepts it; the rest is filler
+    payload = b"%PDF-1.4\n" + os.urandom(args.size_mb * 1024 * 1024)
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            tracemalloc.start()
+            print(f"{args.size_mb} MB per upload")
+            print(f"{'Concurrent':>10} {'Peak MB':>10} {'Seconds':>10}")
+            print("-" * 34)
+            for level in args.levels:
+                peak, elapsed = await run_level(client, payload, level)
+                print(f"{level:>10} {peak:>10.1f} {elapsed:>10.2f}")
+            tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CV upload memory usage")
+    parser.add_argument("--size-mb", type=int, default=5)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="rf-bench-")
+    os.environ["DB_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ.setdefault("FASTAPI_NAME", "bench")
+    # Uploads land in ./data/uploads/cv relative to the working directory
+    os.chdir(tmpdir)
+    os.symlink(os.path.join(ROOT, "app"), os.path.join(tmpdir, "app"))
+    sys.path.insert(0, tmpdir)
+    sys.path.append(ROOT)  # analytics_queries, imported by app/routes/analytics.py
+    asyncio.run(main(args))
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""
+Mixed read/write stress test for the SQLite profile in app/db.py.
+
+Writer processes insert small batches of events through the app's engine
+(as the ingest writers do) while reader processes run analytics_cli.py
+reports against the same file. Each mode runs on a fresh DB:
+
+- default: SQLITE_TUNING=false (rollback journal, the previous behaviour)
+- tuned:   the Settings profile (WAL, busy_timeout, mmap, ...)
+
+and reports `database is locked` errors plus commit latency.
+
+Usage:
+
+    python benchmarks/stress_sqlite.py
+    python benchmarks/stress_sqlite.py --writers 4 --readers 4 --seconds 20
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env(db_path: str, tuned: bool) -> None:
+    os.environ["DB_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("FASTAPI_NAME", "stress")
+    os.environ["SQLITE_TUNING"] = "true" if tuned else "false"
+
+
+def writer(db_path: str, tuned: bool, seconds: float, batch: int, out: mp.Queue) -> None:
+    _env(db_path, tuned)
+    from sqlalchemy import insert
+    from sqlalchemy.exc import OperationalError
+
+    from app.db import SessionLocal
+    from app.models import Event
+
+    rows = [
+        {"session_id": "s", "event_name": "click_buy-now_hero", "page_url": "/",
+         "variant_name": "a", "event_metadata": {}}
+        for _ in range(batch)
+    ]
+    latencies, locked, other = [], 0, 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        db = SessionLocal()
+        t0 = time.perf_counter()
+        try:
+            db.execute(insert(Event), rows)
+            db.commit()
+            latencies.append(time.perf_counter() - t0)
+        except OperationalError as exc:
+            db.rollback()
+            if "database is locked" in str(exc):
+                locked += 1
+            else:
+                other += 1
+        finally:
+            db.close()
+        time.sleep(0.005)
+    out.put(("writer", latencies, locked, other))
+
+
+def reader(db_path: str, tuned: bool, seconds: float, out: mp.Queue) -> None:
+    _env(db_path, tuned)
+    import sqlite3
+
+    import analytics_cli as cli
+
+    latencies, locked, other = [], 0, 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        t0 = time.perf_counter()
+        try:
+            conn = cli.get_connection(db_path)
+            with contextlib.redirect_stdout(io.StringIO()):
+                cli.summary(conn)
+                cli.events_detailed_by_variant(conn, "click_buy-now_hero")
+            conn.close()
+            latencies.append(time.perf_counter() - t0)
+        except sqlite3.OperationalError as exc:
+            if "database is locked" in str(exc):
+                locked += 1
+            else:
+                other += 1
+    out.put(("reader", latencies, locked, other))
+
+
+def run_mode(tuned: bool, args) -> None:
+    db_path = os.path.join(tempfile.mkdtemp(prefix="rf-stress-"), "stress.db")
+    _env(db_path, tuned)
+
+    # Fresh schema; WAL is persistent so set the journal mode up front
+    from sqlalchemy import create_engine
+
+    from bench_analytics import seed
+    from app.db import Base
+    from app import models  # noqa: F401
+
+    engine = create_engine(os.environ["DB_URL"])
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA journal_mode={'WAL' if tuned else 'DELETE'}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    seed(db_path, args.rows)
+
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    procs = [
+        ctx.Process(target=writer, args=(db_path, tuned, args.seconds, args.batch, out))
+        for _ in range(args.writers)
+    ] + [
+        ctx.Process(target=reader, args=(db_path, tuned, args.seconds, out))
+        for _ in range(args.readers)
+    ]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    label = "tuned (WAL profile)" if tuned else "default (SQLITE_TUNING=false)"
+    print(f"\n=== {label} ===")
+    print(f"{'Role':<8} {'Ops':>8} {'Locked':>8} {'Other err':>10} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    print("-" * 70)
+    for role in ("writer", "reader"):
+        lat = sorted(l for r in results if r[0] == role for l in r[1])
+        locked = sum(r[2] for r in results if r[0] == role)
+        other = sum(r[3] for r in results if r[0] == role)
+        if lat:
+            p50 = statistics.median(lat) * 1000
+            p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1000
+            worst = lat[-1] * 1000
+        else:
+            p50 = p99 = worst = 0.0
+        print(f"{role:<8} {len(lat):>8} {locked:>8} {other:>10} {p50:>10.1f} {p99:>10.1f} {worst:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite mixed-load stress test")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--batch", type=int, default=20, help="Rows per write transaction")
+    parser.add_argument("--rows", type=int, default=200_000, help="Rows seeded before the run")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    run_mode(False, args)
+    run_mode(True, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+# gunicorn.conf.py -- loaded automatically by gunicorn from the working directory
+"""Housekeeping for the Prometheus multiprocess files (see app/metrics.py)."""
+import os
+import shutil
+
+
+def on_starting(server):
+    # Values left by a previous run would be added to the new ones
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drops the dead worker's live gauges (queue depth); its counters stay
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,73 @@
+"""Initial schema (tables as created by init_db's create_all)
+
+Databases created before migrations existed already have these tables,
+so each one is only created if it is missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(name, *columns, indexes=()):
+    if sa.inspect(op.get_bind()).has_table(name):
+        return
+    op.create_table(name, *columns)
+    for column in indexes:
+        op.create_index(f"ix_{name}_{column}", name, [column])
+
+
+def upgrade():
+    _create_table(
+        "ab_assignments",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("session_id", sa.String(64)),
+        sa.Column("variant_name", sa.String(50)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        indexes=("id", "session_id", "variant_name"),
+    )
+    _create_table(
+        "page_views",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("session_id", sa.String(64)),
+        sa.Column("page", sa.String(255)),
+        sa.Column("variant_name", sa.String(50)),
+        sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        indexes=("id", "session_id", "page", "variant_name"),
+    )
+    _create_table(
+        "events",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("session_id", sa.String(64)),
+        sa.Column("event_name", sa.String(100)),
+        sa.Column("page_url", sa.String(255)),
+        sa.Column("variant_name", sa.String(50)),
+        sa.Column("metadata", sa.JSON, nullable=True),
+        sa.Column("referrer", sa.Text, nullable=True),
+        sa.Column("user_agent", sa.Text, nullable=True),
+        sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        indexes=("id", "session_id", "event_name", "page_url", "variant_name"),
+    )
+    _create_table(
+        "university_quotes",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("institution_name", sa.String(255)),
+        sa.Column("country", sa.String(100)),
+        sa.Column("quantity", sa.Integer),
+        sa.Column("timeframe", sa.String(100)),
+        sa.Column("contact_email", sa.String(255)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        indexes=("id",),
+    )
+
+
+def downgrade():
+    for name in ("university_quotes", "events", "page_views", "ab_assignments"):
+        op.drop_table(name)
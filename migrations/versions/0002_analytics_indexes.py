@@ -0,0 +1,57 @@
+"""Composite covering indexes for the analytics CLI queries
+
+Replaces the single-column event_name / variant_name / page indexes,
+which are prefixes of the new composite ones.
+
+    events(event_name, variant_name, session_id)  events, events-detailed, events-like
+    events(event_name, page_url, variant_name)    conversion
+    events(variant_name, event_name)              summary
+    events(event_name, timestamp)                 contact-forms
+    events(timestamp)                             recent
+    page_views(page, variant_name)                pageviews, conversion
+    page_views(variant_name, page)                summary
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+NEW_INDEXES = [
+    ("ix_events_event_variant_session", "events", ["event_name", "variant_name", "session_id"]),
+    ("ix_events_event_page_variant", "events", ["event_name", "page_url", "variant_name"]),
+    ("ix_events_variant_event", "events", ["variant_name", "event_name"]),
+    ("ix_events_event_timestamp", "events", ["event_name", "timestamp"]),
+    ("ix_events_timestamp", "events", ["timestamp"]),
+    ("ix_page_views_page_variant", "page_views", ["page", "variant_name"]),
+    ("ix_page_views_variant_page", "page_views", ["variant_name", "page"]),
+]
+
+REDUNDANT_INDEXES = [
+    ("ix_events_event_name", "events", ["event_name"]),
+    ("ix_events_variant_name", "events", ["variant_name"]),
+    ("ix_page_views_page", "page_views", ["page"]),
+    ("ix_page_views_variant_name", "page_views", ["variant_name"]),
+]
+
+
+def upgrade():
+    # if_not_exists: tables created by a newer init_db already have them
+    for name, table, columns in NEW_INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+    for name, table, _ in REDUNDANT_INDEXES:
+        op.drop_index(name, table_name=table, if_exists=True)
+    # Refresh planner statistics so the new indexes are picked up right away
+    op.execute("ANALYZE")
+
+
+def downgrade():
+    for name, table, columns in REDUNDANT_INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+    for name, table, _ in NEW_INDEXES:
+        op.drop_index(name, table_name=table, if_exists=True)
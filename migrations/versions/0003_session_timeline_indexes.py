@@ -0,0 +1,41 @@
+"""(session_id, timestamp) indexes for the funnel command
+
+`analytics_cli.py funnel` reads both tables ordered by session and time;
+these indexes serve that ORDER BY without a sort. They replace the
+single-column session_id indexes, which are their prefix.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+NEW_INDEXES = [
+    ("ix_events_session_timestamp", "events", ["session_id", "timestamp"]),
+    ("ix_page_views_session_timestamp", "page_views", ["session_id", "timestamp"]),
+]
+
+REDUNDANT_INDEXES = [
+    ("ix_events_session_id", "events", ["session_id"]),
+    ("ix_page_views_session_id", "page_views", ["session_id"]),
+]
+
+
+def upgrade():
+    for name, table, columns in NEW_INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+    for name, table, _ in REDUNDANT_INDEXES:
+        op.drop_index(name, table_name=table, if_exists=True)
+    op.execute("ANALYZE")
+
+
+def downgrade():
+    for name, table, columns in REDUNDANT_INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+    for name, table, _ in NEW_INDEXES:
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,31 @@
+"""Timestamp indexes on page_views for the CLI's --since/--until windows
+
+`events` already has (event_name, timestamp) and (timestamp) indexes; these
+give `page_views` the same range scans, by page and over the whole table.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+NEW_INDEXES = [
+    ("ix_page_views_page_timestamp", "page_views", ["page", "timestamp"]),
+    ("ix_page_views_timestamp", "page_views", ["timestamp"]),
+]
+
+
+def upgrade():
+    for name, table, columns in NEW_INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+    op.execute("ANALYZE")
+
+
+def downgrade():
+    for name, table, _ in NEW_INDEXES:
+        op.drop_index(name, table_name=table, if_exists=True)
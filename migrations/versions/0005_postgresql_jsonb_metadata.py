@@ -0,0 +1,37 @@
+"""JSONB events.metadata with a GIN index on PostgreSQL
+
+JSON columns can't be indexed; JSONB can, and a GIN index serves
+containment lookups such as `metadata @> '{"iniciativa": "1"}'`.
+SQLite keeps its JSON text column, so this is a no-op there.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.alter_column(
+        "events", "metadata", type_=postgresql.JSONB(), postgresql_using="metadata::jsonb"
+    )
+    op.create_index(
+        "ix_events_metadata_gin", "events", ["metadata"],
+        postgresql_using="gin", if_not_exists=True,
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_events_metadata_gin", table_name="events", if_exists=True)
+    op.alter_column("events", "metadata", type_=sa.JSON(), postgresql_using="metadata::json")